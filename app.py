@@ -1,150 +1,53 @@
-import os
-import pandas as pd
-
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-import plotly.express as px
-import plotly.io as pio
-import plotly.offline as pyo
-import plotly.colors as pc
-
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 
-import datetime as dt
-from datetime import timedelta
-import sys
-import requests
 from dotenv import load_dotenv
 
-from web3 import Web3
-from eth_abi import decode
-from eth_utils import decode_hex, to_text
-from web3.middleware import geth_poa_middleware
-import time
-import json
-from dash import Dash, html, dcc, Input, Output, State, callback
-from dash import dash_table
-
-import requests
-from dune_client.client import DuneClient
-
-from python_scripts.data_processing import main
+from python_scripts import artifacts, leader
+from python_scripts.dashboard import create_app
+from python_scripts.figures import refresh_in_background
 
-from IPython.display import Image, display
+load_dotenv()
 
-# Adjust external_stylesheets to include the prefix
-external_stylesheets = [
-    'https://cdnjs.cloudflare.com/ajax/libs/normalize/8.0.1/normalize.min.css', 
-    '/rlusd_dash/assets/styles.css'  # Adjusted path for proxying
-]
+# Dashboard plus the figure builder. The builder (data_processing and the
+# chart libraries behind it) is only imported by the first background refresh;
+# serve.py runs the same dashboard without it.
 
-# Initialize placeholders for the figures
-fig1 = fig3 = fig4 = fig6 = fig7 = go.Figure()
+BUILDER_LEASE = 'figure_builder'
 
 scheduler = BackgroundScheduler(daemon=True)
 
-# Initialize Dash App with adjusted config for proxying
-app = Dash(
-    __name__,
-    external_stylesheets=external_stylesheets,
-    assets_url_path='/rlusd_dash/assets',
-    routes_pathname_prefix='/rlusd_dash/',
-    requests_pathname_prefix='/rlusd_dash/'
-)
+# Followers pick up the figures the leader publishes to disk
+app = create_app(reload_from_disk=True)
 
-# Adjust Dash URL prefixes for proxying
-# app.config.assets_url_path = '/rlusd_dash/assets'
-# app.config.routes_pathname_prefix = '/rlusd_dash/'
-# app.config.requests_pathname_prefix = '/rlusd_dash/'
+def run_main():
+    from python_scripts.data_processing import main
 
-def scheduled_main():
     print("Running scheduled main() function...")
-    global fig1, fig3, fig4, fig6, fig7
-    # Call main() and update the figures
-    fig1, fig3, fig4, fig6, fig7 = main()
+    # Only figures whose input datasets changed are rebuilt
+    main()
     print("Updated figures from scheduled main() call.")
 
+def scheduled_main():
+    # Only the worker holding the builder lease rebuilds figures; refreshes
+    # run in the background while the last good figures keep serving
+    if leader.try_acquire(BUILDER_LEASE):
+        refresh_in_background(refresh=run_main)
+    else:
+        artifacts.reload_if_changed()
+
+leader.start_heartbeat(BUILDER_LEASE)
+
+# Start from the figures persisted by the last run and refresh behind them
+print(f"Loaded persisted figures: {artifacts.load()}")
 scheduled_main()
 
-# Schedule the job to run every Sunday at midnight (adjust to your preferred time)
+# Cheap when nothing changed, so check for new data shortly after each hourly collection
 scheduler.add_job(
     scheduled_main, 
-    CronTrigger(day_of_week='sun', hour=0, minute=0, second=0)
+    CronTrigger(minute=5, second=0)
 )
 scheduler.start()
 
-app.layout = html.Div(style={'backgroundColor': 'var(--color-background)'}, children=[
-    html.H1(
-        children='RLUSD Dashboard',
-        style={
-            'textAlign': 'center',
-            'color': 'var(--wcm-color-fg-1)',
-            'fontSize': '36px',
-            'fontWeight': 'bold',
-            'marginBottom': '20px'
-        }
-    ),
-    dcc.Interval(
-        id='interval-component',
-        interval=60*60*1000,  # Refresh every hour (adjust as needed)
-        n_intervals=0
-    ),
-    html.Div(className='graph-container', children=[
-        dcc.Graph(id='supply_by_chain')
-    ]),
-    html.Div(className='graph-container', children=[
-        dcc.Graph(id='ETH_LP_TVL')
-    ]),
-    html.Div(className='graph-container', children=[
-        dcc.Graph(id='supply_by_liquidity')
-    ]),
-    html.Div(className='graph-container', children=[
-        dcc.Graph(id='supply_by_liquidity2')
-    ]),
-    html.Div(className='graph-container', children=[
-        dcc.Graph(id='supply_by_liquidity3')
-    ]),
-
-    # Footer Section
-    html.Footer(style={
-        'backgroundColor': '#333',
-        'color': '#fff',
-        'textAlign': 'center',
-        'padding': '20px',
-        'marginTop': '40px'
-    }, children=[
-        html.P([
-            "Contact: ",
-            html.A("brandynham1120@gmail.com",
-                   href="mailto:brandynham1120@gmail.com",
-                   style={'color': '#fff'})
-        ]),
-        html.P([
-            "Github/Documentation: ",
-            html.A("https://github.com/BrandynHamilton/rlusd_dash",
-                   href="https://github.com/BrandynHamilton/rlusd_dash",
-                   style={'color': '#fff'})
-        ]),
-    ])
-])
-
-@app.callback(
-    Output('supply_by_chain', 'figure'),
-    Output('ETH_LP_TVL', 'figure'),
-    Output('supply_by_liquidity', 'figure'),
-    Output('supply_by_liquidity2', 'figure'),
-    Output('supply_by_liquidity3', 'figure'),
-    Input('interval-component', 'n_intervals')
-)
-def update_graphs(n):
-    return (
-        fig1.return_fig(),
-        fig3.return_fig(),
-        fig4.return_fig(),
-        fig6.return_fig(),
-        fig7.return_fig()
-    )
-
 if __name__ == '__main__':
-    app.run_server(port=8050, debug=False)
+    app.run(port=8050, debug=False)
@@ -0,0 +1,121 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+# Cold-start import benchmark for the serving path.
+#
+# Each module is imported in a fresh interpreter several times. The run fails
+# when the import pulls in any of the heavy modules the serving path must not
+# load, and, once a local baseline has been recorded, when the median wall
+# time is more than --tolerance slower than it.
+#
+#   python benchmarks/import_time.py            # check
+#   python benchmarks/import_time.py --update   # record a local baseline
+#
+# Timings are machine dependent, so the baseline lives under the ignored
+# benchmarks/results/ and is recorded on the machine that runs the check.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / 'results' / 'import_time_baseline.json'
+
+TARGETS = ['serve', 'python_scripts.dashboard']
+
+# Collectors and builders that must stay off the serving path (IPython is
+# not listed: Dash imports it itself when it is installed)
+FORBIDDEN = [
+    'web3',
+    'eth_abi',
+    'dune_client',
+    'defiquant',
+    'xrpl',
+    'chart_builder',
+    'python_scripts.data_processing',
+    'python_scripts.apis',
+]
+
+_SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+def measure(module, runs):
+    env = dict(os.environ)
+    # Empty artifacts dir so every run does the same work
+    env['ARTIFACTS_DIR'] = tempfile.mkdtemp()
+
+    samples = []
+    modules = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-c', _SNIPPET.format(module=module)],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(report['seconds'])
+        modules = report['modules']
+    return statistics.median(samples), modules
+
+def slowest_imports(module, top=10):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start import benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown over the baseline')
+    parser.add_argument('--update', action='store_true', help='record the current timings as the baseline')
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    current = {}
+    failures = []
+
+    for module in TARGETS:
+        seconds, modules = measure(module, args.runs)
+        current[module] = round(seconds, 4)
+
+        leaked = [name for name in FORBIDDEN if any(m == name or m.startswith(f'{name}.') for m in modules)]
+        if leaked:
+            failures.append(f'{module} imports {leaked}')
+
+        limit = baseline.get(module)
+        status = 'ok'
+        if limit is not None and seconds > limit * (1 + args.tolerance):
+            status = 'REGRESSION'
+            failures.append(f'{module} took {seconds:.3f}s, baseline {limit:.3f}s')
+        print(f'{module}: {seconds:.3f}s (baseline {limit if limit is not None else "not recorded"}) {status}')
+
+        for cumulative_us, name in slowest_imports(module):
+            print(f'    {cumulative_us / 1e6:8.3f}s  {name}')
+
+    if args.update:
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(current, indent=2) + '\n')
+        print(f'baseline written to {BASELINE_PATH}')
+        return 0
+
+    if failures:
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Benchmarks for the ingest and processing pipeline.
+#
+# For each history size a synthetic hourly history is written to a throwaway
+# store, then every stage runs against it with all upstream APIs replayed from
+# benchmarks/fixtures (XRPScan, GeckoTerminal and Flipside through
+# http_client's replay mode; Dune and the Ethereum RPC snapshot by swapping
+# the two fetchers that don't go over http_client). Each stage is timed once
+# untraced and once under tracemalloc for peak memory and allocated blocks.
+# Results are written to benchmarks/results/<commit>.json and compared with
+# the most recent earlier result.
+#
+#   python benchmarks/pipeline.py                       # 1m, 1y and 5y
+#   python benchmarks/pipeline.py --sizes 1m --stages hourly_data,daily_data
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+SIZES = {
+    '1m': 24 * 30,
+    '1y': 24 * 365,
+    '5y': 24 * 365 * 5,
+}
+
+# Keep every module that reads its configuration at import time off the real
+# data, keys and network before anything from python_scripts is imported
+_WORK_DIR = tempfile.mkdtemp(prefix='rlusd_bench_')
+os.environ.update({
+    'STORE_DIR': os.path.join(_WORK_DIR, 'store'),
+    'ARTIFACTS_DIR': os.path.join(_WORK_DIR, 'figures'),
+    'LEADER_DB': os.path.join(_WORK_DIR, 'leader.sqlite'),
+    'BACKUP_DIR': os.path.join(_WORK_DIR, 'backup'),
+    'COLLECTOR_CACHE_DIR': os.path.join(_WORK_DIR, 'collector_cache'),
+    'HTTP_REPLAY_FILE': str(FIXTURES_DIR / 'http.json'),
+    'RLUSD_XRP_ADDRESS': 'rMxCKbEDwqr76QuheSUMdEGf4B9xJ8m5De',
+    'XRPL_STREAM': 'false',
+    'XRPL_SOURCE': 'xrpscan',
+    'ETH_POOL_DISCOVERY': 'false',
+})
+os.environ.pop('SOURCE_CACHE_DIR', None)
+os.environ.pop('COLLECTOR_URL', None)
+sys.path.insert(0, str(BASE_DIR))
+os.chdir(BASE_DIR)
+
+from python_scripts import store, rollups  # noqa: E402
+
+ETH_POOLS = ['0xd001ae433f254283fece51d4acce8c53263aa186', '0xcc6d2f26d363836f85a42d249e145ec0320d3e55']
+
+def synthetic_history(hours, end=None):
+    """Hourly timeseries and Ethereum LP rows plus daily DEX volume ending at `end`"""
+    rng = np.random.default_rng(hours)
+    end = pd.Timestamp(end or pd.Timestamp.now(tz='UTC').tz_convert(None).floor('h') - pd.Timedelta(hours=1))
+    index = pd.date_range(end=end, periods=hours, freq='h')
+
+    def walk(start, scale, size):
+        return np.maximum(start + np.cumsum(rng.normal(0, scale, size)), 0)
+
+    timeseries = pd.DataFrame({
+        "hour": index,
+        "dt": index,
+        "xrp_bal": walk(8e6, 2e4, hours),
+        "rlusd_bal": walk(1.8e7, 5e4, hours),
+        "RLUSD_XRPL_Supply": walk(6e7, 1e5, hours),
+        "RLUSD_ETH_Supply": walk(2.4e8, 3e5, hours),
+    })
+
+    lp_frames = []
+    for pool in ETH_POOLS:
+        for symbol in ('RLUSD', 'USDC'):
+            bal = walk(3e6, 1e4, hours)
+            lp_frames.append(pd.DataFrame({
+                "dt": index, "pool": pool, "symbol": symbol,
+                "current_bal": bal, "tvl": bal, "total_tvl": bal * 2,
+            }))
+    eth_lp = pd.concat(lp_frames, ignore_index=True)
+
+    days = pd.date_range(index[0].floor('D'), index[-1].floor('D'), freq='D')
+    dex = pd.concat([
+        pd.DataFrame({"dt": days, "blockchain": chain, "volume": rng.uniform(1e5, 5e6, len(days))})
+        for chain in ('XRPL', 'Ethereum')
+    ], ignore_index=True)
+
+    return {"timeseries": ("hour", [], timeseries), "eth_lp_hourly": ("dt", ['pool', 'symbol'], eth_lp),
+            "dex_data": ("dt", ['blockchain'], dex)}
+
+def seed_store(history):
+    """Write a history the way months of ingest would: per-month appends, then rollups"""
+    for key, (time_col, keep_subset, df) in history.items():
+        months = df[time_col].dt.to_period('M')
+        for _, chunk in df.groupby(months, sort=True):
+            store.append(key, chunk, time_col=time_col, keep_subset=keep_subset)
+        rollups.rebuild_rollups(key)
+
+def _patch_offline_sources():
+    """Replay the Dune and Ethereum RPC fixtures; everything else replays through http_client"""
+    try:
+        from python_scripts import apis
+    except ImportError as e:
+        print(f'collector stages will fail, apis unavailable: {e}')
+        return
+
+    dune_rows = json.loads((FIXTURES_DIR / 'dune_dex_stats.json').read_text())
+    snapshot = json.loads((FIXTURES_DIR / 'eth_snapshot.json').read_text())
+
+    apis.dune_api_results = lambda *args, **kwargs: pd.DataFrame(dune_rows)
+    apis.erc20_snapshot = lambda token, holders=(), **kwargs: dict(snapshot)
+
+def _hourly_data():
+    import data_collection
+    return data_collection.hourly_data()
+
+def _daily_data():
+    import data_collection
+    return data_collection.daily_data()
+
+def _data_processing_main():
+    from python_scripts import data_processing, figures
+    figures._cache.clear()
+    return data_processing.main()
+
+def _create_charts():
+    from python_scripts import data_processing
+    from python_scripts.vizualizations import create_charts
+
+    combined_rlusd_lp, start_date = data_processing.lp_frames()
+    combined_vol, vol_by_chain = data_processing.volume_frames()
+    return create_charts(data_processing.supply_frame(), data_processing.supply_comp_frame(),
+                         combined_rlusd_lp, combined_vol, vol_by_chain, start_date)
+
+def _rebuild_rollups():
+    for key in rollups.ROLLUPS:
+        rollups.rebuild_rollups(key)
+
+STAGES = {
+    "hourly_data": _hourly_data,
+    "daily_data": _daily_data,
+    "rebuild_rollups": _rebuild_rollups,
+    "data_processing.main": _data_processing_main,
+    "create_charts": _create_charts,
+}
+
+def _clear_caches():
+    from python_scripts import source_cache
+    source_cache.clear()
+
+def measure(func):
+    """Wall time of an untraced run, then peak memory and allocated blocks of a traced one"""
+    _clear_caches()
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+
+    _clear_caches()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    allocated = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return {"seconds": round(seconds, 4), "peak_mb": round(peak / 2**20, 2), "blocks": allocated}
+
+def run_size(size, stages):
+    store.clear()
+    history = synthetic_history(SIZES[size])
+
+    results = {}
+    started = time.perf_counter()
+    seed_store(history)
+    results['seed_store'] = {"seconds": round(time.perf_counter() - started, 4)}
+    print(f'[{size}] seed_store: {results["seed_store"]["seconds"]}s')
+
+    for name in stages:
+        try:
+            results[name] = measure(STAGES[name])
+        except Exception as e:
+            results[name] = {"error": f'{type(e).__name__}: {e}'}
+        print(f'[{size}] {name}: {results[name]}')
+    return results
+
+def _commit():
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f'{sha}-dirty' if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def _previous_result(commit):
+    results = sorted(RESULTS_DIR.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in results:
+        if path.stem != commit:
+            return json.loads(path.read_text())
+    return None
+
+def compare(current, previous, tolerance):
+    """Print per-stage changes against a previous run; returns the regressions"""
+    regressions = []
+    for size, stages in current['results'].items():
+        for name, entry in stages.items():
+            old = previous['results'].get(size, {}).get(name, {})
+            if 'seconds' not in entry or 'seconds' not in old or not old['seconds']:
+                continue
+            change = entry['seconds'] / old['seconds'] - 1
+            print(f"  {size:>3} {name:<22} {old['seconds']:>9.3f}s -> {entry['seconds']:>9.3f}s ({change:+.0%})")
+            if change > tolerance:
+                regressions.append(f'{size} {name} {change:+.0%}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline benchmark on synthetic histories and recorded fixtures')
+    parser.add_argument('--sizes', default=','.join(SIZES))
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown over the previous result')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [size for size in args.sizes.split(',') if size]
+    stages = [stage for stage in args.stages.split(',') if stage]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f'unknown stage {stage}; choose from {list(STAGES)}')
+
+    _patch_offline_sources()
+
+    commit = _commit()
+    current = {
+        "commit": commit,
+        "timestamp": pd.Timestamp.now(tz='UTC').isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {}
+    }
+    try:
+        for size in sizes:
+            current['results'][size] = run_size(size, stages)
+    finally:
+        shutil.rmtree(_WORK_DIR, ignore_errors=True)
+
+    regressions = []
+    previous = _previous_result(commit)
+    if previous is not None:
+        print(f"compared with {previous['commit']}:")
+        regressions = compare(current, previous, args.tolerance)
+
+    if not args.no_save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f'{commit}.json'
+        path.write_text(json.dumps(current, indent=2) + '\n')
+        print(f'results written to {path}')
+
+    for regression in regressions:
+        print(f'REGRESSION: {regression}')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,11 +15,16 @@ from diskcache import Cache
 from web3 import Web3
 
 from python_scripts.data_processing import (clean_dataset_values)
-from python_scripts.apis import (supply_data,xrpl_pools ,ethereum_pool_data)
+from python_scripts import store, xrpl_ledger, source_cache, leader, metrics, gapfill, collector_api
+from python_scripts.rollups import update_rollups
+from python_scripts.apis import (xrpl_supply, eth_onchain_snapshot, xrpl_pools ,ethereum_pool_deltas, gecko_terminal_pool_data,
+                                 dune_dex_data, combine_dex_volume)
+from python_scripts.pipeline import fan_out, run_stages
 
 load_dotenv()
 
 app = Flask(__name__)
+app.register_blueprint(collector_api.blueprint)
 
 DUNE_QUERY_ID = os.getenv('DUNE_QUERY_ID')
 RLUSD_XRP_ADDRESS = os.getenv('RLUSD_XRP_ADDRESS')
@@ -27,9 +32,14 @@ RLUSD_ETHEREUM_ADDRESS = os.getenv('RLUSD_ETHEREUM_ADDRESS')
 ETHEREUM_GATEWAY = os.getenv('ETHEREUM_GATEWAY')
 
 DUNE_QUERY_DIR = 'data/rlusd_eth_dex_stats.csv'
-BACKUP_DIR = 'data'
+BACKUP_DIR = os.getenv('BACKUP_DIR', 'data')
+COLLECTOR_CACHE_DIR = os.getenv('COLLECTOR_CACHE_DIR', 'data_collection')
 
 FLIPSIDE_KEY = os.getenv('FLIPSIDE_KEY')
+XRPL_STREAM = os.getenv('XRPL_STREAM', 'false').lower() == 'true'
+# 'xrpscan' polls the XRPScan REST API, 'ledger' batches amm_info/gateway_balances against a node
+XRPL_SOURCE = os.getenv('XRPL_SOURCE', 'xrpscan')
+COLLECTOR_LEASE = 'collector'
 
 w3 = Web3(Web3.HTTPProvider(ETHEREUM_GATEWAY))
 
@@ -42,7 +52,50 @@ for path in abi_paths:
     with open(path, "r") as file:
         abis[path] = json.load(file)
 
-cache = Cache('data_collection')
+os.makedirs(BACKUP_DIR, exist_ok=True)
+cache = Cache(COLLECTOR_CACHE_DIR)
+
+# Datasets the collector kept in the diskcache before the store, as
+# key -> (time_col, keep_subset) in the store
+LEGACY_DATASETS = {
+    "timeseries": ('hour', []),
+    "dex_data": ('dt', ['blockchain']),
+}
+
+def import_legacy_cache():
+    # One-time copy of the diskcache history into the store; rows the store
+    # already covers are left alone
+    for key, (time_col, keep_subset) in LEGACY_DATASETS.items():
+        marker = f'imported_to_store:{key}'
+        if cache.get(marker):
+            continue
+        history = cache.get(key)
+        if history is not None and not history.empty:
+            history = history.copy()
+            if key == 'timeseries':
+                # The earliest rows were written before the hour column existed
+                dts = pd.to_datetime(history['dt'], utc=True).dt.floor('h').dt.strftime('%Y-%m-%d %H:00:00')
+                history['hour'] = history['hour'].fillna(dts)
+            imported = store.prepend(key, history, time_col=time_col, keep_subset=keep_subset)
+            update_rollups(key, imported)
+            print(f'Imported {len(imported)} {key} rows from the diskcache')
+        cache.set(marker, True)
+
+def append_backup(key, rows):
+    # CSV backups are appended to. A file with other columns, including the
+    # full rewrites from before the store with their index column, is moved
+    # aside to <key>.<timestamp>.csv so every file keeps one header.
+    backup_path = os.path.join(BACKUP_DIR,f'{key}.csv')
+    if os.path.exists(backup_path):
+        with open(backup_path, 'r') as file:
+            header = file.readline().rstrip('\n').split(',')
+        if set(header) == set(rows.columns):
+            rows = rows[header]
+        else:
+            stamp = dt.datetime.now(dt.timezone.utc).strftime('%Y%m%d%H%M%S')
+            os.replace(backup_path, os.path.join(BACKUP_DIR, f'{key}.{stamp}.csv'))
+            print(f'{key} backup columns changed, rotated the old file')
+    rows.to_csv(backup_path, mode='a', index=False, header=not os.path.exists(backup_path))
 
 def update_cache_data(data, key='timeseries',time_col='dt',keep_subset=None, granularity=None):
     #timeseries column must have dt as name, 
@@ -50,58 +103,82 @@ def update_cache_data(data, key='timeseries',time_col='dt',keep_subset=None, gra
     if keep_subset is None:
         keep_subset = []
 
-    keep_cols = [time_col]+keep_subset
-    
-    print(f'keep_cols: {keep_cols}')
-
     if isinstance(data, pd.DataFrame):  
-        new_data = data
+        new_data = data.copy()
     elif isinstance(data, dict):       
         new_data = pd.DataFrame([data])
     else:
         raise TypeError('Pass a DataFrame or dict for data')
 
-    historical_data = cache.get(f'{key}', pd.DataFrame())
-    # historical_data = historical_data.reset_index()
-    historical_data = pd.concat([historical_data, new_data]).reset_index(drop=True)
-    historical_data.drop_duplicates(subset=keep_cols, keep='last', inplace=True)
-    historical_data[time_col] = pd.to_datetime(historical_data[time_col])
-    
-    print(f'historical_data before resampling:\n{historical_data}')
-
-    breakpoint()
-
-    if granularity is not None:
-        group_cols = keep_cols
-        historical_data = (
-            historical_data
-            .set_index(time_col)
-            .sort_index()
-            .groupby(group_cols, group_keys=False)
-            .resample(granularity)
-            .ffill()
-            .reset_index()
-        )
-
-    print(f'historical_data after resampling:\n{historical_data}')
-    cache.set(f'{key}', historical_data)
-    historical_data.to_csv(os.path.join(BACKUP_DIR,f'{key}.csv'))
-    print(f'Saved {key} with {granularity}')
+    if new_data.empty:
+        print(f'No new rows for {key}')
+        return
+
+    with metrics.timed('transform', key):
+        new_data[time_col] = pd.to_datetime(new_data[time_col], utc=True).dt.tz_convert(None)
+
+        if granularity is not None:
+            # Only the new rows are put on the grid, filled on from the last stored values
+            new_data = gapfill.fill_tail(key, new_data, time_col, keep_subset, granularity)
+            if new_data.empty:
+                print(f'No new {granularity} rows for {key}')
+                return
 
+    with metrics.timed('store', key):
+        manifest = store.append(key, new_data, time_col=time_col, keep_subset=keep_subset)
+        update_rollups(key, new_data)
+
+        append_backup(key, new_data)
+    metrics.inc('rows_written_total', len(new_data), dataset=key)
+    print(f"Appended {len(new_data)} rows to {key} (seq {manifest['seq']}) with {granularity}")
+
+@metrics.timed('job', 'hourly_data')
 def hourly_data():
     print(f'Running Main')
 
-    # Here we are collecting supply by chain, and supply in XRPL AMM 
-
-    rlusd_XRP_supply, rlusd_ETH_supply = supply_data()
-    
-    rl_usd_xrp_pool_data = xrpl_pools(pool='rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3')
+    import_legacy_cache()
 
-    _, _, rlusd_in_xrp_lp, xrp_in_xrp_lp = clean_dataset_values(rl_usd_xrp_pool_data)
+    # Here we are collecting supply by chain, and supply in XRPL AMM 
 
     today_utc = dt.datetime.now(dt.timezone.utc) 
     formatted_today_utc = today_utc.strftime('%Y-%m-%d %H:00:00')
 
+    xrpl_pool = 'rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3'
+
+    if XRPL_SOURCE == 'ledger':
+        # Supply and every tracked AMM read from one validated ledger in one batch
+        results = fan_out({
+            "xrpl_ledger": xrpl_ledger.amm_snapshot,
+            "eth_onchain": eth_onchain_snapshot
+        })
+    else:
+        results = fan_out({
+            "xrpl_supply": xrpl_supply,
+            "eth_onchain": eth_onchain_snapshot,
+            "xrpl_pool": lambda: xrpl_pools(pool=xrpl_pool)
+        })
+
+    eth_onchain = results['eth_onchain']
+    rlusd_ETH_supply = eth_onchain['total_supply'] if eth_onchain is not None else None
+
+    rlusd_XRP_supply = rlusd_in_xrp_lp = xrp_in_xrp_lp = None
+    if XRPL_SOURCE == 'ledger':
+        xrpl_snapshot = results['xrpl_ledger']
+        if xrpl_snapshot is not None:
+            _, amm_pools, rlusd_XRP_supply = xrpl_snapshot
+            tracked = amm_pools[amm_pools['pool'] == xrpl_pool] if not amm_pools.empty else amm_pools
+            if not tracked.empty:
+                xrp_in_xrp_lp = tracked['xrp_bal'].iloc[0]
+                rlusd_in_xrp_lp = tracked['rlusd_bal'].iloc[0]
+            if not amm_pools.empty:
+                update_cache_data(data=amm_pools.assign(hour=formatted_today_utc),key='xrpl_amm_hourly',
+                                  time_col='hour',keep_subset=['pool'],granularity=None)
+    else:
+        rlusd_XRP_supply = results['xrpl_supply']
+        rl_usd_xrp_pool_data = results['xrpl_pool']
+        if rl_usd_xrp_pool_data is not None:
+            _, _, rlusd_in_xrp_lp, xrp_in_xrp_lp = clean_dataset_values(rl_usd_xrp_pool_data)
+
     timeseries_entry = {
         "dt":today_utc,
         "hour":formatted_today_utc,
@@ -114,62 +191,116 @@ def hourly_data():
     update_cache_data(data=timeseries_entry,key='timeseries',
                       time_col='hour',granularity=None)
 
+    if eth_onchain is not None and eth_onchain['balances']:
+        # RLUSD held by each Ethereum pool, read at the same block as the supply
+        eth_lp_onchain = pd.DataFrame({
+            "hour": formatted_today_utc,
+            "pool": list(eth_onchain['balances']),
+            "rlusd_bal": list(eth_onchain['balances'].values()),
+            "block": eth_onchain['block']
+        })
+        update_cache_data(data=eth_lp_onchain,key='eth_lp_onchain',
+                          time_col='hour',keep_subset=['pool'],granularity=None)
+
     print(f'Hourly data collected at {today_utc}')
     return {"status": "success", "timestamp": today_utc.isoformat()}
     
-def daily_data():
-
-    today_utc = dt.datetime.now(dt.timezone.utc) 
+# Daily pipeline stages
+
+def load_eth_watermarks():
+    # Only hours after each pool's last stored hour are queried; the stored
+    # balances at that hour seed the forward fill. The store tracks every
+    # series' last hour, so pools missing from the latest day keep theirs.
+    eth_lp_history = store.last_rows('eth_lp_hourly', columns=['current_bal'])
+    watermarks = {}
+    seed_balances = {}
+    if not eth_lp_history.empty:
+        for pool, pool_rows in eth_lp_history.groupby('pool'):
+            last_dt = pool_rows['dt'].max()
+            last_rows = pool_rows[pool_rows['dt'] == last_dt]
+            watermarks[pool] = last_dt
+            seed_balances[pool] = dict(zip(last_rows['symbol'], last_rows['current_bal']))
+        print(f'eth lp watermarks: {watermarks}')
+    return watermarks, seed_balances
+
+def load_dex_start():
+    dex_history = store.tail('dex_data', columns=[])
+    if dex_history.empty:
+        return None
+
+    dex_start_date = dex_history['dt'].iloc[-1]
+    print(f'dex_start_date: {dex_start_date}')
+    start_timestamp = int(dex_start_date.timestamp())
+    print(f'start_timestamp: {start_timestamp}')
+    return start_timestamp
+
+def fetch_xrpl_volume(dex_start):
+    return gecko_terminal_pool_data(start_date=dex_start)
+
+def fetch_eth_volume():
+    return dune_dex_data(DUNE_QUERY_ID,DUNE_QUERY_DIR)
+
+def fetch_eth_lp(eth_watermarks):
+    watermarks, seed_balances = eth_watermarks
+    return ethereum_pool_deltas(watermarks=watermarks, seed_balances=seed_balances)
+
+def store_eth_lp(fetch_eth_lp):
+    update_cache_data(data=fetch_eth_lp,key='eth_lp_hourly',
+                      time_col='dt',keep_subset=['pool','symbol'],
+                      granularity=None)
 
-    eth_rlusd_pool_data = cache.get('eth_rlusd_pool_data',pd.DataFrame())
-    if not eth_rlusd_pool_data.empty:
-        eth_start_date = eth_rlusd_pool_data['dt'].iloc[-1]
-        print(f'eth_start_date: {eth_start_date}')
-    else:
-        eth_start_date = today_utc.strftime('%Y-%m-%d')
+def store_volume(fetch_xrpl_volume, fetch_eth_volume):
+    combined_vol = combine_dex_volume(fetch_xrpl_volume, fetch_eth_volume)
+    update_cache_data(data=combined_vol.rename_axis('dt').reset_index(),key='dex_data',
+                      time_col='dt',keep_subset=['blockchain'],
+                      granularity=None)
 
-    dex_data = cache.get('dex_data',pd.DataFrame())
-    if not dex_data.empty:
-        dex_start_date = dex_data['dt'].iloc[-1]
-        print(f'dex_start_date: {dex_start_date}')
-    else:
-        dex_start_date = None
+DAILY_STAGES = {
+    "eth_watermarks": (load_eth_watermarks, []),
+    "dex_start": (load_dex_start, []),
+    "fetch_xrpl_volume": (fetch_xrpl_volume, ['dex_start']),
+    "fetch_eth_volume": (fetch_eth_volume, []),
+    "fetch_eth_lp": (fetch_eth_lp, ['eth_watermarks']),
+    "store_eth_lp": (store_eth_lp, ['fetch_eth_lp']),
+    "store_volume": (store_volume, ['fetch_xrpl_volume', 'fetch_eth_volume']),
+}
+
+@metrics.timed('job', 'daily_data')
+def daily_data():
 
-    if dex_start_date:
-        start_timestamp = int(dex_start_date.timestamp())
-        print(f'start_timestamp: {start_timestamp}')
+    today_utc = dt.datetime.now(dt.timezone.utc) 
 
-    combined_vol = dex_data(start_date=start_timestamp)
-    
-    eth_rlusd_pool = ethereum_pool_data(start_date=eth_start_date)
+    # Ethereum LP and DEX volume branches run side by side; a slow or failing
+    # provider only holds up the stages downstream of it
+    _, report = run_stages(DAILY_STAGES)
 
-    update_cache_data(data=eth_rlusd_pool.reset_index(),key='eth_rlusd_pool_data',
-                      time_col='dt',keep_subset=['symbol'],
-                      granularity=None)
-    
-    update_cache_data(data=combined_vol.rename_axis('dt').reset_index(),key='dex_data',
-                      time_col='dt',keep_subset=['blockchain'],
-                      granularity=None)
-    
+    status = "success" if all(entry['status'] == 'ok' for entry in report.values()) else "partial"
     print(f'Daily data collected at {today_utc}')
-    return {"status": "success", "timestamp": today_utc.isoformat()}
+    return {"status": status, "timestamp": today_utc.isoformat(), "stages": report}
  
-# Create and start the scheduler
+# Create and start the scheduler. Every worker schedules the jobs, but only
+# the one holding the collector lease runs them.
+leader.start_heartbeat(COLLECTOR_LEASE)
+
 scheduler = BackgroundScheduler()
 scheduler.add_job(
-    hourly_data, 
+    leader.leader_only(COLLECTOR_LEASE)(hourly_data), 
     trigger=CronTrigger(minute=0),  # Runs at the top of every hour
     id='hourly_fetch_job', 
     replace_existing=True
 )
 scheduler.add_job(
-    daily_data, 
+    leader.leader_only(COLLECTOR_LEASE)(daily_data), 
     trigger=CronTrigger(day='*', hour=0, minute=0),  # Every day at midnight
     id='daily_fetch_job', 
     replace_existing=True
 )
 scheduler.start()
 
+if XRPL_STREAM:
+    # Per-ledger XRPL balances alongside the hourly REST snapshot, streamed by the leader only
+    xrpl_ledger.start_background(should_run=lambda: leader.is_leader(COLLECTOR_LEASE))
+
 @app.route('/')
 def home():
     return jsonify({"message": "RLUSD Data Collection Service Running!"})
@@ -209,25 +340,20 @@ def job_status():
         return jsonify({"status": "error", "message": "Invalid job type"}), 400
 
     if job:
-        return jsonify({"next_run_time": job.next_run_time.isoformat()})
+        return jsonify({
+            "next_run_time": job.next_run_time.isoformat(),
+            "leader": leader.holder(COLLECTOR_LEASE),
+            "is_leader": leader.is_leader(COLLECTOR_LEASE)
+        })
     return jsonify({"error": "Job not found"}), 404
 
-@app.route('/dataset', methods=['GET'])
-def get_timeseries():
-    """Returns cached dataset"""
-    dataset = cache.get('timeseries')
-
-    if dataset.empty:
-        return jsonify({"error":"No data found"}), 404
-
-    dataset_json = dataset.to_dict(orient='records')
-    return jsonify(dataset_json), 200
-
 @app.route('/clear_cache', methods=['POST'])
 def clear_cache():
     """Endpoint to clear the cache"""
     try:
         cache.clear()
+        store.clear()
+        source_cache.clear()
         return jsonify({"message": "Cache cleared successfully!"}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to clear cache: {str(e)}"}), 500
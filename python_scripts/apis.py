@@ -1,17 +1,17 @@
 from python_scripts.utils import call_api
 from defiquant import dune_api_results
 import pandas as pd
-import requests
 from web3 import Web3
 import os
 import json
 from dotenv import load_dotenv
-from defiquant import (pool_data, active_addresses, token_dex_stats)
-from defiquant import (flipside_api_results,dune_api_results)
-from cachetools import TTLCache, cached
+from defiquant import (active_addresses, token_dex_stats)
+from cachetools import TTLCache
 
-daily_cache = TTLCache(maxsize=100, ttl=7200)  # Cache valid for 6h for flexibility
-hourly_cache = TTLCache(maxsize=100, ttl=3000)  # Cache valid for 50m for flexibility 
+daily_cache = TTLCache(maxsize=int(os.getenv('DAILY_CACHE_SIZE', 100)),
+                       ttl=float(os.getenv('DAILY_CACHE_TTL', 7200)))  # Cache valid for 2h for flexibility
+hourly_cache = TTLCache(maxsize=int(os.getenv('HOURLY_CACHE_SIZE', 100)),
+                        ttl=float(os.getenv('HOURLY_CACHE_TTL', 3000)))  # Cache valid for 50m for flexibility
 
 load_dotenv()
 
@@ -22,6 +22,18 @@ DUNE_QUERY_ID = os.getenv('DUNE_QUERY_ID')
 FLIPSIDE_KEY = os.getenv('FLIPSIDE_KEY')
 
 DUNE_QUERY_DIR = 'data/rlusd_eth_dex_stats.csv'
+
+# Curve and Uniswap RLUSD pools; override with a comma separated ETH_RLUSD_POOLS
+ETH_RLUSD_POOLS = [
+    pool.strip().lower() for pool in os.getenv(
+        'ETH_RLUSD_POOLS',
+        '0xd001ae433f254283fece51d4acce8c53263aa186,0xcc6d2f26d363836f85a42d249e145ec0320d3e55'
+    ).split(',') if pool.strip()
+]
+# Also track any other DEX pool holding at least ETH_POOL_MIN_USD of RLUSD
+ETH_POOL_DISCOVERY = os.getenv('ETH_POOL_DISCOVERY', 'false').lower() == 'true'
+ETH_POOL_MIN_USD = float(os.getenv('ETH_POOL_MIN_USD', 10000))
+
 erc20_abi_path = 'abi/erc20_abi.json'
 
 abi_paths = [erc20_abi_path]
@@ -33,8 +45,12 @@ for path in abi_paths:
 
 w3 = Web3(Web3.HTTPProvider(ETHEREUM_GATEWAY))
 
-from python_scripts.utils import (call_api, get_pagination_results)
+from python_scripts.utils import call_api, get_pagination_results, fetch_all, flipside_api_results
+from python_scripts.source_cache import source_cached
+from python_scripts.onchain import erc20_snapshot
+from sql_queries.sql_scripts import lp_data_batch, rlusd_pools_query
 
+@source_cached(daily_cache)
 def dune_dex_data(DUNE_QUERY_ID,DUNE_QUERY_DIR):
     rlusd_eth_dex_stats = dune_api_results(DUNE_QUERY_ID,DUNE_QUERY_DIR)
 
@@ -48,6 +64,7 @@ def dune_dex_data(DUNE_QUERY_ID,DUNE_QUERY_DIR):
 
     return rlusd_eth_dex_stats
 
+@source_cached(daily_cache)
 def gecko_terminal_pool_data(
     network='xrpl',
     pool='524C555344000000000000000000000000000000.rMxCKbEDwqr76QuheSUMdEGf4B9xJ8m5De_XRP',
@@ -80,28 +97,19 @@ def gecko_terminal_pool_data(
 
     return df.set_index('timestamp')
 
-def supply_data():
-    # Ethereum Supply
-    rlusd_ETH_supply = None
-    rlusd_XRP_supply = None
-
-    try:
-        rlusd_contract = w3.eth.contract(address=RLUSD_ETHEREUM_ADDRESS, abi=abis['abi/erc20_abi.json'])
-        rlusd_ETH_supply = rlusd_contract.functions.totalSupply().call() / 1e18
-    except Exception as e:
-        print(f'web3.py call failed: {e}')
-
-    # XRPL Supply
-    try:
-        base_url = f'https://api.xrpscan.com/api/v1/account/{RLUSD_XRP_ADDRESS}/obligations'
-        data = call_api(base_url)
-        rlusd_raw = pd.DataFrame(data)
-        rlusd_XRP_supply = float(rlusd_raw['value'].values[0])
-    except Exception as e:
-        print(f'xrpscan call failed: {e}')
+@source_cached(hourly_cache)
+def eth_onchain_snapshot(pools=None):
+    # RLUSD supply and the RLUSD balance of every tracked pool at one block
+    return erc20_snapshot(RLUSD_ETHEREUM_ADDRESS, pools if pools is not None else ETH_RLUSD_POOLS, w3=w3)
 
-    return rlusd_XRP_supply, rlusd_ETH_supply
+@source_cached(hourly_cache)
+def xrpl_supply():
+    base_url = f'https://api.xrpscan.com/api/v1/account/{RLUSD_XRP_ADDRESS}/obligations'
+    data = call_api(base_url)
+    rlusd_raw = pd.DataFrame(data)
+    return float(rlusd_raw['value'].values[0])
 
+@source_cached(hourly_cache)
 def xrpl_pools(pool='rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3'):
 
     "This gets all rlusd pools in AMM or returns a singlular pool"
@@ -124,12 +132,8 @@ def xrpl_pools(pool='rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3'):
 
             rlusd_pools = filtered_df['Account'].unique()
 
-            all_results = []
-
-            for ammpool in rlusd_pools:
-                base_url = f'https://api.xrpscan.com/api/v1/amm/{ammpool}'
-                data = call_api(base_url)
-                all_results.append(data)
+            pool_urls = [f'https://api.xrpscan.com/api/v1/amm/{ammpool}' for ammpool in rlusd_pools]
+            all_results = [data for data in fetch_all(pool_urls) if data is not None]
 
             rl_usd_xrp_pool_data = pd.DataFrame(all_results)
         except Exception as e:
@@ -145,11 +149,7 @@ def xrpl_pools(pool='rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3'):
     
     return rl_usd_xrp_pool_data
 
-def dex_data(start_date):
-
-    xrpl_vol = gecko_terminal_pool_data(start_date=start_date)
-
-    rlusd_eth_dex_stats = dune_dex_data(DUNE_QUERY_ID,DUNE_QUERY_DIR)
+def combine_dex_volume(xrpl_vol, rlusd_eth_dex_stats):
 
     filtered_rlusd_eth_dex = rlusd_eth_dex_stats[['blockchain','volume']].resample('D').agg({
         "blockchain":'last',
@@ -164,34 +164,61 @@ def dex_data(start_date):
 
     return combined_vol
 
-def ethereum_pool_data(start_date):
+def dex_data(start_date):
 
-    eth_rlusd_pool_query1 = pool_data(network='ethereum',address='0xd001ae433f254283fece51d4acce8c53263aa186',
-                                      start_date=start_date, freq='D')
-    eth_rlusd_pool = flipside_api_results(eth_rlusd_pool_query1,FLIPSIDE_KEY)
+    xrpl_vol = gecko_terminal_pool_data(start_date=start_date)
 
-    eth_rlusd_pool_query2 = pool_data(network='ethereum',address='0xcc6d2f26d363836f85a42d249e145ec0320d3e55',
-                                      start_date=start_date, freq='D')
-    eth_rlusd_pool2 = flipside_api_results(eth_rlusd_pool_query2,FLIPSIDE_KEY)
+    rlusd_eth_dex_stats = dune_dex_data(DUNE_QUERY_ID,DUNE_QUERY_DIR)
 
-    eth_rlusd_pool.dropna(inplace=True)
-    eth_rlusd_pool2.dropna(inplace=True)
+    return combine_dex_volume(xrpl_vol, rlusd_eth_dex_stats)
 
-    print(f'eth_rlusd_pool: {eth_rlusd_pool}, eth_rlusd_pool: {eth_rlusd_pool}')
+def discover_eth_pools(min_usd=ETH_POOL_MIN_USD):
+    pools = flipside_api_results(rlusd_pools_query(RLUSD_ETHEREUM_ADDRESS, min_usd), FLIPSIDE_KEY)
+    if pools.empty:
+        return []
+    return pools['pool_address'].str.lower().tolist()
 
-    eth_rlusd_pool = pd.concat([eth_rlusd_pool.drop(columns=['total_tvl','__row_index']),eth_rlusd_pool2.drop(columns=['total_tvl','__row_index'])]).groupby(['symbol','dt']).sum().reset_index()
+def tracked_eth_pools():
+    pools = list(ETH_RLUSD_POOLS)
+    if ETH_POOL_DISCOVERY:
+        try:
+            discovered = [pool for pool in discover_eth_pools() if pool not in pools]
+            if discovered:
+                print(f'discovered eth pools: {discovered}')
+            pools += discovered
+        except Exception as e:
+            print(f'eth pool discovery failed: {e}')
+    return pools
+
+def ethereum_pool_deltas(pools=None, watermarks=None, seed_balances=None):
+    """
+    Incremental hourly LP balances for every tracked Ethereum pool.
+
+    All pools are fetched in one warehouse query partitioned by pool.
+    watermarks maps pool address -> last stored hour and seed_balances maps
+    pool address -> {symbol: balance} at that hour. Pools without a watermark
+    are fetched from the start of the series. Returns one row per pool, symbol
+    and hour after the watermark.
+    """
+
+    if pools is None:
+        pools = tracked_eth_pools()
+    if not pools:
+        return pd.DataFrame()
+    watermarks = {
+        pool: pd.Timestamp(watermark).strftime('%Y-%m-%d %H:00:00')
+        for pool, watermark in (watermarks or {}).items() if watermark is not None
+    }
 
-    eth_rlusd_pool['dt'] = pd.to_datetime(eth_rlusd_pool['dt'])
-    eth_rlusd_pool.set_index('dt',inplace=True)
+    query = lp_data_batch(pools, watermarks=watermarks, seed_balances=seed_balances)
+    deltas = flipside_api_results(query, FLIPSIDE_KEY)
 
-    eth_rlusd_pool.sort_index(inplace=True, ascending=False)
-    total_tvl = eth_rlusd_pool.groupby(eth_rlusd_pool.index)['tvl'].sum()
+    if deltas.empty:
+        return pd.DataFrame()
 
-    eth_rlusd_pool = eth_rlusd_pool.merge(
-        total_tvl.to_frame('total_tvl'),
-        left_index=True,
-        right_index=True,
-        how='inner'
-    )
+    deltas = deltas.drop(columns=['__row_index'], errors='ignore').dropna()
+    deltas['pool'] = deltas['pool'].str.lower()
+    deltas['dt'] = pd.to_datetime(deltas['dt'])
+    print(f"eth lp rows per pool: {deltas.groupby('pool').size().to_dict()}")
 
-    return eth_rlusd_pool
\ No newline at end of file
+    return deltas.reset_index(drop=True)
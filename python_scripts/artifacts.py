@@ -0,0 +1,127 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Serialized figure payloads, compressed once per data refresh and tagged
+# with a content hash so the app can answer conditional requests (ETag/304)
+# and skip resending figures a client already has.
+#
+# Every published artifact is also written to ARTIFACTS_DIR
+# (<name>.json.gz plus manifest.json, each replaced atomically) so a restarted
+# app can serve the last good figures straight away and refresh behind them.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ARTIFACTS_DIR = os.getenv('ARTIFACTS_DIR', os.path.join(BASE_DIR, 'data', 'figures'))
+
+_artifacts = {}
+_lock = threading.Lock()
+_manifest_mtime = None
+
+def make_etag(payload):
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def _manifest_path():
+    return os.path.join(ARTIFACTS_DIR, 'manifest.json')
+
+def _write_atomic(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+    os.replace(tmp_path, path)
+
+def _persist(name, artifact):
+    os.makedirs(ARTIFACTS_DIR, exist_ok=True)
+    _write_atomic(os.path.join(ARTIFACTS_DIR, f'{name}.json.gz'), artifact['gzip'])
+    # Merge into the manifest on disk so figures this process never built stay listed
+    manifest = {}
+    if os.path.exists(_manifest_path()):
+        with open(_manifest_path(), 'r') as file:
+            manifest = json.load(file)
+    manifest[name] = {"etag": artifact['etag'], "versions": artifact['versions']}
+    _write_atomic(_manifest_path(), json.dumps(manifest, indent=2).encode('utf-8'))
+
+def publish(name, payload, versions=None):
+    artifact = {
+        "etag": make_etag(payload),
+        "gzip": gzip.compress(payload.encode('utf-8'), compresslevel=6),
+        "versions": versions or {}
+    }
+    with _lock:
+        _artifacts[name] = artifact
+        try:
+            _persist(name, artifact)
+        except OSError as e:
+            print(f'Failed to persist {name}: {e}')
+    return artifact
+
+def load(replace=False):
+    """
+    Load the artifacts persisted on disk; returns the names loaded.
+
+    By default entries already in memory win (anything published since
+    startup is newer than the disk copy). With replace=True entries whose
+    ETag differs from disk are swapped for the disk copy, which is how a
+    serving-only process picks up figures built by another process.
+    """
+
+    global _manifest_mtime
+
+    path = _manifest_path()
+    if not os.path.exists(path):
+        return []
+
+    mtime = os.path.getmtime(path)
+    with open(path, 'r') as file:
+        manifest = json.load(file)
+
+    loaded = {}
+    for name, entry in manifest.items():
+        current = _artifacts.get(name)
+        if current is not None and (not replace or current['etag'] == entry['etag']):
+            continue
+        try:
+            with open(os.path.join(ARTIFACTS_DIR, f'{name}.json.gz'), 'rb') as file:
+                data = file.read()
+        except OSError as e:
+            print(f'Skipping persisted {name}: {e}')
+            continue
+        loaded[name] = {"etag": entry['etag'], "gzip": data, "versions": entry.get('versions', {})}
+
+    with _lock:
+        for name, artifact in loaded.items():
+            if replace:
+                _artifacts[name] = artifact
+            else:
+                _artifacts.setdefault(name, artifact)
+        _manifest_mtime = mtime
+    return list(loaded)
+
+def reload_if_changed():
+    """Reload from disk when the manifest has been rewritten since the last load"""
+    path = _manifest_path()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return []
+    if _manifest_mtime is not None and mtime <= _manifest_mtime:
+        return []
+    return load(replace=True)
+
+def get(name):
+    return _artifacts.get(name)
+
+def etags():
+    return {name: artifact['etag'] for name, artifact in _artifacts.items()}
+
+def payload(name):
+    artifact = _artifacts.get(name)
+    if artifact is None:
+        return None
+    return gzip.decompress(artifact['gzip']).decode('utf-8')
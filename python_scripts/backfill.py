@@ -0,0 +1,258 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from web3 import Web3
+from dotenv import load_dotenv
+
+from python_scripts import store
+from python_scripts.onchain import get_w3, abis, erc20_abi_path
+
+load_dotenv()
+
+# Rebuilds Ethereum RLUSD history straight from Transfer logs.
+#
+# The block range is split into chunks that are fetched concurrently; a chunk
+# the provider rejects for returning too many logs is halved until it fits.
+# Chunks are persisted a window at a time, in block order, so the checkpoint
+# always marks a contiguous prefix of the range and an interrupted backfill
+# resumes from the next unscanned block. Transfers are stored raw under
+# 'rlusd_transfers' and folded into hourly balances per tracked address (plus
+# 'total_supply' from mints and burns) under 'eth_balances_backfill'.
+
+RLUSD_ETHEREUM_ADDRESS = os.getenv('RLUSD_ETHEREUM_ADDRESS')
+RLUSD_DEPLOY_BLOCK = int(os.getenv('RLUSD_DEPLOY_BLOCK', 0))
+BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', 2000))
+BACKFILL_MIN_CHUNK = int(os.getenv('BACKFILL_MIN_CHUNK', 1))
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 4))
+BACKFILL_DIR = os.getenv('BACKFILL_DIR', os.path.join(store.BASE_DIR, 'data', 'backfill'))
+# Fetch every block's timestamp instead of interpolating inside a chunk
+BACKFILL_EXACT_TIMESTAMPS = os.getenv('BACKFILL_EXACT_TIMESTAMPS', 'false').lower() == 'true'
+
+ZERO_ADDRESS = '0x' + '0' * 40
+SUPPLY = 'total_supply'
+
+TRANSFERS_KEY = 'rlusd_transfers'
+BALANCES_KEY = 'eth_balances_backfill'
+
+# Substrings providers use when a log query spans too many results
+TOO_MANY_RESULTS = [
+    'more than',
+    'too many',
+    'limit exceeded',
+    'response size',
+    'range is too large',
+    'block range',
+    '-32005',
+]
+
+def _event_signature(abi, name):
+    event = next(item for item in abi if item.get('type') == 'event' and item.get('name') == name)
+    types = ','.join(arg['type'] for arg in event['inputs'])
+    return Web3.keccak(text=f'{name}({types})').hex()
+
+TRANSFER_TOPIC = _event_signature(abis[erc20_abi_path], 'Transfer')
+
+def _too_many_results(error):
+    message = str(error).lower()
+    return any(marker in message for marker in TOO_MANY_RESULTS)
+
+def _topic_address(topic):
+    topic = topic.hex() if hasattr(topic, 'hex') else topic
+    return '0x' + topic[-40:].lower()
+
+def _data_int(data):
+    data = data.hex() if hasattr(data, 'hex') else data
+    return int(data, 16) if data not in ('0x', '') else 0
+
+def fetch_logs(token, from_block, to_block, w3=None):
+    """
+    Transfer logs for token in [from_block, to_block].
+
+    Ranges the provider refuses as too large are split in half recursively,
+    down to BACKFILL_MIN_CHUNK blocks.
+    """
+
+    w3 = w3 or get_w3()
+    try:
+        return list(w3.eth.get_logs({
+            "address": Web3.to_checksum_address(token),
+            "fromBlock": from_block,
+            "toBlock": to_block,
+            "topics": [TRANSFER_TOPIC]
+        }))
+    except Exception as e:
+        if not _too_many_results(e) or to_block - from_block + 1 <= BACKFILL_MIN_CHUNK:
+            raise
+        middle = (from_block + to_block) // 2
+        print(f'blocks {from_block}-{to_block} too large, splitting at {middle}')
+        return fetch_logs(token, from_block, middle, w3) + fetch_logs(token, middle + 1, to_block, w3)
+
+def _block_times(blocks, from_block, to_block, w3):
+    if BACKFILL_EXACT_TIMESTAMPS:
+        return {block: w3.eth.get_block(block)['timestamp'] for block in set(blocks)}
+
+    # Interpolate between the chunk's boundary blocks: one call per edge
+    start = w3.eth.get_block(from_block)['timestamp']
+    end = w3.eth.get_block(to_block)['timestamp']
+    span = max(to_block - from_block, 1)
+    return {
+        block: start + (end - start) * (block - from_block) / span
+        for block in set(blocks)
+    }
+
+def scan_chunk(token, from_block, to_block, decimals=18, w3=None):
+    """Fetch and decode one chunk of Transfer logs into a DataFrame"""
+    w3 = w3 or get_w3()
+    logs = fetch_logs(token, from_block, to_block, w3)
+    if not logs:
+        return pd.DataFrame(columns=['dt', 'block', 'log_index', 'from', 'to', 'value'])
+
+    times = _block_times([log['blockNumber'] for log in logs], from_block, to_block, w3)
+    scale = 10 ** decimals
+
+    transfers = pd.DataFrame({
+        "block": [log['blockNumber'] for log in logs],
+        "log_index": [log['logIndex'] for log in logs],
+        "from": [_topic_address(log['topics'][1]) for log in logs],
+        "to": [_topic_address(log['topics'][2]) for log in logs],
+        "value": [_data_int(log['data']) / scale for log in logs],
+    })
+    transfers['dt'] = pd.to_datetime(transfers['block'].map(times), unit='s')
+    return transfers
+
+def fold_balances(transfers, addresses, opening=None, start=None):
+    """
+    Fold transfers into hourly end-of-hour balances.
+
+    Returns (hourly, closing): hourly has one row per hour and address from
+    start (or the first transfer) to the last transfer, and closing maps each
+    address to its balance after the last hour. opening carries balances in
+    from a previous window.
+    """
+
+    tracked = [address.lower() for address in addresses]
+    opening = opening or {}
+
+    flows = pd.concat([
+        transfers.loc[transfers['to'].isin(tracked), ['dt', 'to', 'value']]
+            .rename(columns={'to': 'address'}),
+        transfers.loc[transfers['from'].isin(tracked), ['dt', 'from', 'value']]
+            .rename(columns={'from': 'address'}).assign(value=lambda df: -df['value']),
+        transfers.loc[transfers['from'] == ZERO_ADDRESS, ['dt', 'value']].assign(address=SUPPLY),
+        transfers.loc[transfers['to'] == ZERO_ADDRESS, ['dt', 'value']]
+            .assign(address=SUPPLY, value=lambda df: -df['value']),
+    ], ignore_index=True)
+
+    columns = tracked + [SUPPLY]
+    if flows.empty:
+        return pd.DataFrame(columns=['dt', 'address', 'balance']), dict(opening)
+
+    flows['hour'] = flows['dt'].dt.floor('h')
+    deltas = flows.pivot_table(index='hour', columns='address', values='value', aggfunc='sum')
+
+    first = start if start is not None else deltas.index.min()
+    last = deltas.index.max()
+    hours = pd.date_range(min(first, last), last, freq='h')
+
+    deltas = deltas.reindex(index=hours, columns=columns).fillna(0.0)
+    balances = deltas.cumsum() + pd.Series({col: opening.get(col, 0.0) for col in columns})
+
+    closing = balances.iloc[-1].to_dict()
+    hourly = balances.rename_axis(index='dt', columns='address').stack().rename('balance').reset_index()
+    return hourly, closing
+
+def _checkpoint_path(token):
+    return os.path.join(BACKFILL_DIR, f'{token.lower()}.json')
+
+def load_checkpoint(token):
+    path = _checkpoint_path(token)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def _write_checkpoint(token, checkpoint):
+    os.makedirs(BACKFILL_DIR, exist_ok=True)
+    path = _checkpoint_path(token)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(checkpoint, file, indent=2)
+    os.replace(tmp_path, path)
+
+def backfill(token=None, addresses=None, start_block=None, end_block=None,
+             chunk_size=BACKFILL_CHUNK_SIZE, max_workers=BACKFILL_WORKERS, w3=None):
+    """
+    Scan Transfer logs from start_block to end_block and build hourly balances.
+
+    Resumes from the checkpoint for token when one exists for the same
+    tracked addresses. Balances are only absolute when the scan starts at or
+    before the contract's deploy block (RLUSD_DEPLOY_BLOCK).
+    """
+
+    if addresses is None:
+        from python_scripts.apis import ETH_RLUSD_POOLS
+        addresses = ETH_RLUSD_POOLS
+
+    w3 = w3 or get_w3()
+    token = token or RLUSD_ETHEREUM_ADDRESS
+    addresses = sorted(address.lower() for address in addresses)
+    end_block = end_block if end_block is not None else w3.eth.block_number
+
+    checkpoint = load_checkpoint(token)
+    if checkpoint is not None and checkpoint['addresses'] != addresses:
+        print(f'tracked addresses changed, restarting backfill for {token}')
+        checkpoint = None
+    if checkpoint is None:
+        first_block = start_block if start_block is not None else RLUSD_DEPLOY_BLOCK
+        checkpoint = {
+            "token": token,
+            "addresses": addresses,
+            "start_block": first_block,
+            "next_block": first_block,
+            "last_hour": None,
+            "balances": {}
+        }
+
+    erc20 = w3.eth.contract(address=Web3.to_checksum_address(token), abi=abis[erc20_abi_path])
+    decimals = erc20.functions.decimals().call()
+
+    chunks = [
+        (block, min(block + chunk_size - 1, end_block))
+        for block in range(checkpoint['next_block'], end_block + 1, chunk_size)
+    ]
+    print(f'backfilling {token} blocks {checkpoint["next_block"]}-{end_block} in {len(chunks)} chunks')
+
+    window = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for i in range(0, len(chunks), window):
+            batch = chunks[i:i + window]
+            frames = list(executor.map(lambda chunk: scan_chunk(token, *chunk, decimals=decimals, w3=w3), batch))
+            # Empty chunks carry untyped columns that would turn dt into objects
+            frames = [frame for frame in frames if not frame.empty]
+            transfers = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+            if not transfers.empty:
+                store.append(TRANSFERS_KEY, transfers, time_col='dt', keep_subset=['block', 'log_index'], partition='M')
+
+                # Start from the last stored hour so a window that continues it
+                # restates that hour's balance and fills any quiet hours between
+                last_hour = pd.Timestamp(checkpoint['last_hour']) if checkpoint['last_hour'] else None
+                hourly, closing = fold_balances(transfers, addresses, checkpoint['balances'], start=last_hour)
+
+                # A window whose transfers never touch a tracked address (or mint
+                # or burn) changes no balance; only the block cursor moves on
+                if not hourly.empty:
+                    store.append(BALANCES_KEY, hourly, time_col='dt', keep_subset=['address'], partition='M')
+                    checkpoint['last_hour'] = hourly['dt'].max().isoformat()
+                checkpoint['balances'] = closing
+
+            checkpoint['next_block'] = batch[-1][1] + 1
+            _write_checkpoint(token, checkpoint)
+            print(f'backfill at block {checkpoint["next_block"]} ({len(transfers)} transfers)')
+
+    return checkpoint
+
+if __name__ == '__main__':
+    backfill()
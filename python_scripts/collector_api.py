@@ -0,0 +1,187 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+
+from python_scripts import store, metrics
+
+# Read-only endpoints over the store and the collector's metrics, registered
+# on the collector's Flask app. They only need the store and metrics, so they
+# are kept apart from the collectors and their API clients.
+
+blueprint = Blueprint('collector_api', __name__)
+
+FORMATS = ('json', 'ndjson', 'arrow', 'parquet')
+
+class InvalidRequest(ValueError):
+    pass
+
+@blueprint.errorhandler(InvalidRequest)
+def bad_request(error):
+    return jsonify({"error": str(error)}), 400
+
+def _dataset_key():
+    """The requested dataset key, which must name an existing dataset"""
+    key = request.args.get('key', 'timeseries')
+    if not store.valid_key(key):
+        raise InvalidRequest(f'Invalid key: {key}')
+    return key, store.load_manifest(key)
+
+def _timestamp_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        timestamp = pd.NaT
+    if pd.isna(timestamp):
+        raise InvalidRequest(f'Invalid {name}: {value}')
+    return timestamp
+
+def _int_arg(name, minimum):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise InvalidRequest(f'Invalid {name}: {value}')
+    if number < minimum:
+        raise InvalidRequest(f'{name} must be at least {minimum}')
+    return number
+
+def _columns_arg(key):
+    columns = request.args.get('columns')
+    if not columns:
+        return None
+    columns = [col for col in columns.split(',') if col]
+    unknown = [col for col in columns if col not in store.columns(key)]
+    if unknown:
+        raise InvalidRequest(f'Unknown columns for {key}: {unknown}')
+    return columns
+
+def _parse_cursor(cursor):
+    # Cursor is "<partition>:<row offset within partition>"
+    if not cursor:
+        return None, 0
+    partition_id, _, offset = cursor.rpartition(':')
+    if not partition_id or not offset.isdigit():
+        raise InvalidRequest(f'Invalid cursor: {cursor}')
+    return partition_id, int(offset)
+
+def _dataset_page(key, start, end, columns, cursor, limit):
+    """Collect up to `limit` rows from `cursor`, returning them and the next cursor"""
+    after_partition, offset = _parse_cursor(cursor)
+    frames = []
+    remaining = limit
+
+    for partition_id, df in store.iter_partitions(key, start=start, end=end, columns=columns,
+                                                  after_partition=after_partition):
+        skip = offset if partition_id == after_partition else 0
+        rows = df.iloc[skip:skip + remaining]
+        frames.append(rows)
+        remaining -= len(rows)
+        if remaining == 0:
+            return frames, f'{partition_id}:{skip + len(rows)}'
+
+    return frames, None
+
+def _ndjson_stream(key, start, end, columns):
+    for _, df in store.iter_partitions(key, start=start, end=end, columns=columns):
+        yield df.to_json(orient='records', lines=True, date_format='iso') + '\n'
+
+@blueprint.route('/dataset', methods=['GET'])
+def get_timeseries():
+    """
+    Returns a stored dataset.
+
+    Query params: key (default timeseries), start, end, columns (comma separated),
+    format (json, ndjson, arrow, parquet), limit and cursor for paging. When
+    limit is set the next page's cursor is returned in the X-Next-Cursor header.
+    Without a limit, ndjson is streamed one partition at a time.
+    """
+    fmt = request.args.get('format', 'json')
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+
+    key, manifest = _dataset_key()
+    if manifest is None:
+        return jsonify({"error":"No data found"}), 404
+
+    start = _timestamp_arg('start')
+    end = _timestamp_arg('end')
+    columns = _columns_arg(key)
+    cursor = request.args.get('cursor')
+    _parse_cursor(cursor)
+    limit = _int_arg('limit', minimum=1)
+
+    if fmt == 'ndjson' and limit is None and cursor is None:
+        return Response(stream_with_context(_ndjson_stream(key, start, end, columns)),
+                        mimetype='application/x-ndjson')
+
+    if limit is not None or cursor is not None:
+        frames, next_cursor = _dataset_page(key, start, end, columns, cursor, limit or 1000)
+    else:
+        frames = [df for _, df in store.iter_partitions(key, start=start, end=end, columns=columns)]
+        next_cursor = None
+
+    dataset = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    if fmt == 'json':
+        if dataset.empty and cursor is None:
+            return jsonify({"error":"No data found"}), 404
+        dataset_json = dataset.to_dict(orient='records')
+        return jsonify(dataset_json), 200, headers
+
+    if fmt == 'ndjson':
+        body = dataset.to_json(orient='records', lines=True, date_format='iso') if not dataset.empty else ''
+        return Response(body, mimetype='application/x-ndjson', headers=headers)
+
+    table = pa.Table.from_pandas(dataset, preserve_index=False)
+    buffer = io.BytesIO()
+    if fmt == 'arrow':
+        with pa.ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table)
+        mimetype = 'application/vnd.apache.arrow.stream'
+    else:
+        pq.write_table(table, buffer)
+        mimetype = 'application/vnd.apache.parquet'
+
+    return Response(buffer.getvalue(), mimetype=mimetype, headers=headers)
+
+@blueprint.route('/sync', methods=['GET'])
+def sync_dataset():
+    """
+    Rows of a dataset written after sequence number `since`, as Parquet.
+
+    The dataset's epoch, current seq, time column and dedupe columns are
+    returned in headers so a client can merge the delta into its own copy and
+    ask for since=<seq> next time. Seqs only carry over within one epoch.
+    """
+    key, manifest = _dataset_key()
+    if manifest is None:
+        return jsonify({"error":"No data found"}), 404
+
+    since = _int_arg('since', minimum=0) or 0
+
+    delta, seq = store.changes(key, since=since)
+
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(delta, preserve_index=False), buffer)
+
+    headers = {
+        "X-Dataset-Epoch": manifest.get('epoch', ''),
+        "X-Dataset-Seq": str(seq),
+        "X-Time-Col": manifest['time_col'],
+        "X-Keep-Subset": ','.join(manifest['keep_subset'])
+    }
+    return Response(buffer.getvalue(), mimetype='application/vnd.apache.parquet', headers=headers)
+
+@blueprint.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Step timings, HTTP and cache counters in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
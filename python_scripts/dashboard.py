@@ -0,0 +1,159 @@
+import os
+import json
+from pathlib import Path
+
+from dash import Dash, html, dcc, Input, Output, State, no_update
+from flask import request, Response
+
+from python_scripts import artifacts
+
+# The Dash app itself: layout, the figure callback and the raw figure route.
+# It only reads the published figure artifacts, so it can be served by a
+# process that never imports the data collectors or chart builders
+# (serve.py), or alongside the builder in app.py.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Adjust external_stylesheets to include the prefix
+external_stylesheets = [
+    'https://cdnjs.cloudflare.com/ajax/libs/normalize/8.0.1/normalize.min.css', 
+    '/rlusd_dash/assets/styles.css'  # Adjusted path for proxying
+]
+
+# Graph id -> figure artifact, in layout order
+GRAPHS = [
+    ('supply_by_chain', 'rlusd_fig1'),
+    ('ETH_LP_TVL', 'rlusd_fig3'),
+    ('supply_by_liquidity', 'rlusd_fig4'),
+    ('supply_by_liquidity2', 'rlusd_fig6'),
+    ('supply_by_liquidity3', 'rlusd_fig7'),
+]
+
+# Parsed figures keyed by (name, etag) so each payload is decoded once
+_parsed = {}
+
+def _figure(name, artifact):
+    key = (name, artifact['etag'])
+    if key not in _parsed:
+        for stale in [k for k in _parsed if k[0] == name]:
+            del _parsed[stale]
+        _parsed[key] = json.loads(artifacts.payload(name))
+    return _parsed[key]
+
+def create_layout():
+    return html.Div(style={'backgroundColor': 'var(--color-background)'}, children=[
+        html.H1(
+            children='RLUSD Dashboard',
+            style={
+                'textAlign': 'center',
+                'color': 'var(--wcm-color-fg-1)',
+                'fontSize': '36px',
+                'fontWeight': 'bold',
+                'marginBottom': '20px'
+            }
+        ),
+        dcc.Interval(
+            id='interval-component',
+            interval=60*60*1000,  # Refresh every hour (adjust as needed)
+            n_intervals=0
+        ),
+        # ETags of the figures this browser already has
+        dcc.Store(id='figure-etags'),
+        *[
+            html.Div(className='graph-container', children=[dcc.Graph(id=graph_id)])
+            for graph_id, _ in GRAPHS
+        ],
+
+        # Footer Section
+        html.Footer(style={
+            'backgroundColor': '#333',
+            'color': '#fff',
+            'textAlign': 'center',
+            'padding': '20px',
+            'marginTop': '40px'
+        }, children=[
+            html.P([
+                "Contact: ",
+                html.A("brandynham1120@gmail.com",
+                       href="mailto:brandynham1120@gmail.com",
+                       style={'color': '#fff'})
+            ]),
+            html.P([
+                "Github/Documentation: ",
+                html.A("https://github.com/BrandynHamilton/rlusd_dash",
+                       href="https://github.com/BrandynHamilton/rlusd_dash",
+                       style={'color': '#fff'})
+            ]),
+        ])
+    ])
+
+def create_app(reload_from_disk=False):
+    """
+    Build the Dash app.
+
+    With reload_from_disk the callback first picks up any artifacts another
+    process has written to disk since the last check.
+    """
+
+    # Initialize Dash App with adjusted config for proxying
+    app = Dash(
+        __name__,
+        external_stylesheets=external_stylesheets,
+        assets_folder=os.path.join(BASE_DIR, 'assets'),
+        assets_url_path='/rlusd_dash/assets',
+        routes_pathname_prefix='/rlusd_dash/',
+        requests_pathname_prefix='/rlusd_dash/'
+    )
+    app.layout = create_layout()
+
+    @app.callback(
+        *[Output(graph_id, 'figure') for graph_id, _ in GRAPHS],
+        Output('figure-etags', 'data'),
+        Input('interval-component', 'n_intervals'),
+        State('figure-etags', 'data')
+    )
+    def update_graphs(n, client_etags):
+        # Serve the published figures; building happens elsewhere. Figures
+        # the client already holds (same ETag) are not resent.
+        if reload_from_disk:
+            artifacts.reload_if_changed()
+
+        client_etags = client_etags or {}
+        figures = []
+        current_etags = {}
+        for _, name in GRAPHS:
+            artifact = artifacts.get(name)
+            if artifact is None:
+                figures.append({})
+                continue
+            current_etags[name] = artifact['etag']
+            if client_etags.get(name) == artifact['etag']:
+                figures.append(no_update)
+            else:
+                figures.append(_figure(name, artifact))
+
+        if current_etags == client_etags:
+            return tuple([no_update] * (len(GRAPHS) + 1))
+        return tuple(figures) + (current_etags,)
+
+    @app.server.route('/rlusd_dash/figures/<name>.json')
+    def figure_json(name):
+        """Pre-serialized figure JSON with ETag/304 support"""
+        if reload_from_disk:
+            artifacts.reload_if_changed()
+
+        artifact = artifacts.get(name)
+        if artifact is None:
+            return Response(status=404)
+
+        etag = f'"{artifact["etag"]}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers={"ETag": etag})
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if 'gzip' in request.headers.get('Accept-Encoding', ''):
+            headers["Content-Encoding"] = "gzip"
+            return Response(artifact['gzip'], mimetype='application/json', headers=headers)
+        return Response(artifacts.payload(name), mimetype='application/json', headers=headers)
+
+    return app
@@ -1,187 +1,177 @@
-import os
 import pandas as pd
 
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-import plotly.express as px
-import plotly.io as pio
-import plotly.offline as pyo
-import plotly.colors as pc
-
-import datetime as dt
-from datetime import timedelta
-import sys
-import requests
 from dotenv import load_dotenv
 
-from web3 import Web3
-from eth_abi import decode
-from eth_utils import decode_hex, to_text
-from web3.middleware import geth_poa_middleware
-import time
-import json
-from dash import Dash, html, dcc, Input, Output, State, callback
-from dash import dash_table
-
-from diskcache import Cache
-from pathlib import Path
-
-import requests
-from dune_client.client import DuneClient
-
-from chart_builder.scripts.visualization_pipeline import visualization_pipeline
-from chart_builder.scripts.utils import data_processing,create_df,open_json, main as chartBuilder
-
-# Set the default template
-from sql_queries.sql_scripts import lp_data
-from python_scripts.utils import (flipside_api_results, call_api, prepare_data_for_simulation, dune_api_results)
+from python_scripts import datasets
+from python_scripts.figures import register_figure, refresh_figures
+from python_scripts.vizualizations import (supply_by_chain_chart, supply_by_liquidity_chart, lp_by_chain_chart,
+                                           volume_by_chain_pie, volume_by_chain_bar)
 
 load_dotenv()
 
-#Connecting to proprietary data collection database
-
-base_cache_dir = Path(__file__).resolve().parent
-print(f'Base Directory: {base_cache_dir}')
-cache = Cache(os.path.join(base_cache_dir, 'data_collection')) 
-
-#Environment Variables
-RLUSD_ETHEREUM = os.getenv('RLUSD_ETHEREUM')
-RLUSD_XRP = os.getenv('RLUSD_XRP')
-DUNE_KEY = os.getenv('DUNE_API_KEY')
-FLIPSIDE_KEY = os.getenv('FLIPSIDE_API_KEY')
-ETHEREUM_GATEWAY = os.getenv('ETHEREUM_GATEWAY')
-
-dune = DuneClient(DUNE_KEY)
-w3 = Web3(Web3.HTTPProvider(ETHEREUM_GATEWAY))
+# Datasets come from the collector's /sync API (COLLECTOR_URL) or the shared store.
+# Nothing here talks to an API or a node, so importing this module stays cheap.
 
-erc20_abi_path = 'abi/erc20_abi.json'
-
-abi_paths = [erc20_abi_path]
-abis = {}
-
-for path in abi_paths:
-    with open(path, "r") as file:
-        abis[path] = json.load(file)
-
-def main():
-
-    today_utc = dt.datetime.now(dt.timezone.utc) 
-    formatted_today_utc = today_utc.strftime('%Y-%m-%d %H:00:00')
-
-    cached_timeseries = cache.get('timeseries',pd.DataFrame())
-    weekly_data = cache.get('weekly_timeseries',pd.DataFrame())
+def supply_frame():
+    cached_timeseries = datasets.tail('timeseries')
 
     if cached_timeseries.empty:
         print(f'no cached data to process')
 
     rlusd_ETH_supply = cached_timeseries['RLUSD_ETH_Supply'].iloc[-1]
     rlusd_XRP_supply = cached_timeseries['RLUSD_XRPL_Supply'].iloc[-1]
-    rlusd_in_xrp_lp = cached_timeseries['rlusd_bal'].iloc[-1]
-
-    print(f'cached_timeseries: {cached_timeseries}')
 
     supply_dict = {
         "Blockchain":["Ethereum","XRP"],
         "Supply":[rlusd_ETH_supply,rlusd_XRP_supply]
     }
 
-    supply_df = pd.DataFrame(supply_dict)
+    return pd.DataFrame(supply_dict)
 
+def supply_comp_frame():
+    supply_df = supply_frame()
     total_rlusd_supply = supply_df['Supply'].sum()
 
-    eth_rlusd_bal_timeseries = eth_rlusd_pool[eth_rlusd_pool['symbol']=='RLUSD']
-
-    rlusd_in_eth_lp = eth_rlusd_pool[eth_rlusd_pool['symbol']=='RLUSD'].iloc[0][['current_bal']].values[0]
+    rlusd_in_xrp_lp = datasets.tail('timeseries', columns=['rlusd_bal'])['rlusd_bal'].iloc[-1]
+    rlusd_in_eth_lp = eth_rlusd_lp_balance()
 
     total_rlusd_in_lp = rlusd_in_eth_lp + rlusd_in_xrp_lp
 
-    percent_rlusd_in_lp = (total_rlusd_in_lp / total_rlusd_supply)*100
-
     supply_comp = {
         "Status":["In-Liquidity","Out-Liquidity"],
         "Amount":[total_rlusd_in_lp, (total_rlusd_supply-total_rlusd_in_lp)]
     }
 
-    supply_comp_df = pd.DataFrame(supply_comp)
+    return pd.DataFrame(supply_comp)
 
-    xrpl_lp_timeseries = cache.get('timeseries')
+def eth_rlusd_lp_balance():
+    # Latest hourly on-chain snapshot of the tracked pools, falling back to the
+    # last daily warehouse balance until the collector has written one
+    onchain = datasets.tail('eth_lp_onchain', columns=['rlusd_bal'])
+    if not onchain.empty:
+        latest = onchain[onchain['hour'] == onchain['hour'].max()]
+        return latest['rlusd_bal'].sum()
+    return eth_rlusd_daily_lp()['current_bal'].iloc[-1]
 
-    xrpl_lp_timeseries['dt'] = pd.to_datetime(xrpl_lp_timeseries['dt'])
-    xrpl_lp_timeseries['dt'] = pd.to_datetime(xrpl_lp_timeseries['dt'].dt.strftime('%Y-%m-%d %H:00:00'))
+def eth_rlusd_daily_lp():
+    eth_daily_lp = datasets.read('eth_lp_hourly_daily')
+    return eth_daily_lp[eth_daily_lp['symbol']=='RLUSD'].set_index('dt').sort_index()
 
-    xrpl_lp_timeseries.set_index('dt',inplace=True)
+def xrpl_daily_lp():
+    xrpl_daily = datasets.read('timeseries_daily', columns=['rlusd_bal']).set_index('dt')
 
-    rlusd_xrp_df = xrpl_lp_timeseries[['rlusd_bal']]
+    rlusd_xrp_df = xrpl_daily[['rlusd_bal']].rename(columns={"rlusd_bal":"current_bal"})
     rlusd_xrp_df['blockchain'] = 'XRP Ledger'
-    rlusd_xrp_df.rename(columns={"rlusd_bal":"current_bal"},inplace=True)
+    return rlusd_xrp_df
 
-    eth_rlusd_bal_timeseries.index = eth_rlusd_bal_timeseries.index.strftime('%Y-%m-%d %H:00:00')
+def lp_frames():
+    # Everything here reads the rollups maintained at ingest time (see
+    # python_scripts.rollups) rather than re-deriving them from raw history
+    rlusd_xrp_df = xrpl_daily_lp()
 
-    rlusd_eth_df = eth_rlusd_bal_timeseries[['current_bal']]
+    rlusd_eth_df = eth_rlusd_daily_lp()[['current_bal']].copy()
     rlusd_eth_df['blockchain'] = 'Ethereum'
 
-    rlusd_eth_df.index = pd.to_datetime(rlusd_eth_df.index)
+    # Cover the XRPL date range with the last known Ethereum balance
+    daily_index = pd.date_range(rlusd_xrp_df.index.min(), rlusd_xrp_df.index.max(), freq='D')
+    daily_eth_lp = rlusd_eth_df.reindex(rlusd_eth_df.index.union(daily_index)).ffill()
+    daily_xrpl_lp = rlusd_xrp_df.ffill()
 
-    merged_df = pd.merge(
-        rlusd_eth_df[['current_bal']].rename(columns={"current_bal":"RLUSD_ETH_LP"}),
-        rlusd_xrp_df[['current_bal']].rename(columns={"current_bal":"RLUSD_XRP_LP"}),
-        left_index=True,
-        right_index=True,
-        how='right'
-    ).ffill()
+    combined_rlusd_lp = pd.concat([daily_eth_lp,daily_xrpl_lp])
+    combined_rlusd_lp.sort_index(inplace=True)
 
-    rlusd_eth_df = prepare_data_for_simulation(rlusd_eth_df,rlusd_xrp_df.index.min(),rlusd_xrp_df.index.max())
+    return combined_rlusd_lp, rlusd_xrp_df.index.min()
 
-    rlusd_xrp_df.ffill(inplace=True)
-    daily_eth_lp = rlusd_eth_df.resample('D').last()
-    daily_xrpl_lp = rlusd_xrp_df.resample('D').last()
+def volume_frames():
+    combined_vol = datasets.read('dex_data_daily').set_index('dt').sort_index()
+    vol_by_chain = datasets.read('dex_data_total')[['blockchain','volume']]
 
-    combined_rlusd_lp = pd.concat([daily_eth_lp,daily_xrpl_lp])
-    combined_rlusd_lp.index = pd.to_datetime(combined_rlusd_lp.index)
-    combined_rlusd_lp.sort_index(inplace=True)
+    return combined_vol, vol_by_chain
 
-    combined_vol.sort_index(inplace=True)
-    combined_vol_total = combined_vol.groupby(combined_vol.index)[['volume']].sum()
-    vol_by_chain = combined_vol.groupby('blockchain')[['volume']].sum().reset_index()
+@register_figure('rlusd_fig1', inputs=['timeseries'])
+def build_supply_by_chain():
+    return supply_by_chain_chart(supply_frame())
 
-    fig1, fig3, fig4, fig6, fig7 = create_charts()
+@register_figure('rlusd_fig3', inputs=['timeseries', 'eth_lp_onchain', 'eth_lp_hourly_daily'])
+def build_supply_by_liquidity():
+    return supply_by_liquidity_chart(supply_comp_frame())
 
-    return fig1, fig3, fig4, fig6, fig7
+@register_figure('rlusd_fig4', inputs=['timeseries_daily', 'eth_lp_hourly_daily'])
+def build_lp_by_chain():
+    combined_rlusd_lp, start_date = lp_frames()
+    return lp_by_chain_chart(combined_rlusd_lp, start_date)
 
-def clean_dataset_values(rl_usd_xrp_pool_data_og): 
+@register_figure('rlusd_fig6', inputs=['dex_data_daily', 'timeseries_daily'])
+def build_volume_by_chain_bar():
+    combined_vol, _ = volume_frames()
+    start_date = datasets.read('timeseries_daily', columns=[])['dt'].min()
+    return volume_by_chain_bar(combined_vol, start_date)
 
-    rl_usd_xrp_pool_data = rl_usd_xrp_pool_data_og.copy()
+@register_figure('rlusd_fig7', inputs=['dex_data_total'])
+def build_volume_by_chain_pie():
+    _, vol_by_chain = volume_frames()
+    return volume_by_chain_pie(vol_by_chain)
 
-    rl_usd_xrp_pool_data["amount2_value"] = rl_usd_xrp_pool_data["amount2"].apply(lambda x: float(x["value"]) if isinstance(x, dict) and "value" in x else None)
+# Order matches the dashboard layout
+FIGURE_NAMES = ['rlusd_fig1', 'rlusd_fig3', 'rlusd_fig4', 'rlusd_fig6', 'rlusd_fig7']
 
-    rl_usd_xrp_pool_data["token1"] = rl_usd_xrp_pool_data["amount"].apply(lambda x: x["currency"] if isinstance(x, dict) else "XRP")
-    rl_usd_xrp_pool_data["amount1"] = rl_usd_xrp_pool_data["amount"].apply(lambda x: float(x["value"]) if isinstance(x, dict) and "value" in x else pd.to_numeric(x, errors="coerce"))
+def main():
+    """Rebuild any dashboard figure whose input datasets changed since the last call"""
+    return refresh_figures(FIGURE_NAMES)
 
-    # Extract currency from 'amount2'
-    rl_usd_xrp_pool_data["token2"] = rl_usd_xrp_pool_data["amount2"].apply(lambda x: x["currency"] if isinstance(x, dict) else "XRP")
-    rl_usd_xrp_pool_data["amount2"] = rl_usd_xrp_pool_data["amount2"].apply(lambda x: float(x["value"]) if isinstance(x, dict) and "value" in x else pd.to_numeric(x, errors="coerce"))
+RLUSD_CURRENCY_HEX = "524C555344000000000000000000000000000000"
+XRP_DROPS = 1e6
 
-    rl_usd_xrp_pool_data["token1"] = rl_usd_xrp_pool_data["token1"].replace("524C555344000000000000000000000000000000", "RLUSD")
-    rl_usd_xrp_pool_data["token2"] = rl_usd_xrp_pool_data["token2"].replace("524C555344000000000000000000000000000000", "RLUSD")
+def split_amounts(amounts):
+    """
+    Columnar parse of XRPL Amount fields.
 
-    xpr_rlusd_pool = rl_usd_xrp_pool_data[
-        ((rl_usd_xrp_pool_data["token1"] == "XRP") | (rl_usd_xrp_pool_data["token1"] == "RLUSD")) &
-        ((rl_usd_xrp_pool_data["token2"] == "XRP") | (rl_usd_xrp_pool_data["token2"] == "RLUSD"))
-    ]
+    Issued currencies arrive as {"currency", "issuer", "value"} dicts and XRP as
+    a string of drops. Returns currency, raw numeric value and the value
+    normalized to whole units (drops / 1e6 for XRP) for the whole column at once.
+    """
+    amounts = pd.Series(amounts)
+    is_issued = amounts.map(type).eq(dict)
 
-    xpr_rlusd_pool['amount1_norm'] = xpr_rlusd_pool['amount1'] / 1e6
+    currency = pd.Series("XRP", index=amounts.index, dtype=object)
+    value = pd.to_numeric(amounts.where(~is_issued), errors="coerce")
 
-    rlusd_in_xrp_lp = xpr_rlusd_pool['amount2_value'].values[0]
+    if is_issued.any():
+        issued = pd.DataFrame(amounts[is_issued].tolist(), index=amounts.index[is_issued])
+        if 'currency' in issued:
+            currency[is_issued] = issued['currency'].replace(RLUSD_CURRENCY_HEX, "RLUSD")
+        if 'value' in issued:
+            value[is_issued] = pd.to_numeric(issued['value'], errors="coerce")
 
-    xrp_in_xrp_lp = xpr_rlusd_pool['amount1_norm'].values[0]
+    normalized = value.where(is_issued, value / XRP_DROPS)
 
-    return rl_usd_xrp_pool_data, xpr_rlusd_pool, rlusd_in_xrp_lp, xrp_in_xrp_lp
+    return currency, value, normalized
+
+def clean_dataset_values(rl_usd_xrp_pool_data_og): 
+    # Works on any number of AMM pools at once; the scalar balances returned
+    # are for the first XRP/RLUSD pool, as before
 
-    
+    rl_usd_xrp_pool_data = rl_usd_xrp_pool_data_og.drop(columns=['amount2'])
 
+    token1, amount1, amount1_norm = split_amounts(rl_usd_xrp_pool_data_og["amount"])
+    token2, amount2, amount2_norm = split_amounts(rl_usd_xrp_pool_data_og["amount2"])
 
+    rl_usd_xrp_pool_data["token1"] = token1
+    rl_usd_xrp_pool_data["amount1"] = amount1
+    rl_usd_xrp_pool_data["amount1_norm"] = amount1_norm
+    rl_usd_xrp_pool_data["token2"] = token2
+    rl_usd_xrp_pool_data["amount2"] = amount2
+    rl_usd_xrp_pool_data["amount2_norm"] = amount2_norm
+    rl_usd_xrp_pool_data["amount2_value"] = amount2.where(token2.ne("XRP"))
 
-    
-    
+    rl_usd_xrp_pool_data["rlusd_bal"] = amount1_norm.where(token1.eq("RLUSD"), amount2_norm.where(token2.eq("RLUSD")))
+    rl_usd_xrp_pool_data["xrp_bal"] = amount1_norm.where(token1.eq("XRP"), amount2_norm.where(token2.eq("XRP")))
 
+    pair_tokens = ["XRP", "RLUSD"]
+    xpr_rlusd_pool = rl_usd_xrp_pool_data[token1.isin(pair_tokens) & token2.isin(pair_tokens)]
 
+    rlusd_in_xrp_lp = xpr_rlusd_pool['rlusd_bal'].values[0]
+
+    xrp_in_xrp_lp = xpr_rlusd_pool['xrp_bal'].values[0]
+
+    return rl_usd_xrp_pool_data, xpr_rlusd_pool, rlusd_in_xrp_lp, xrp_in_xrp_lp
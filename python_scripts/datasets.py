@@ -0,0 +1,9 @@
+from python_scripts.sync_client import COLLECTOR_URL
+
+# Where the dashboard reads datasets from: the collector's /sync API when
+# COLLECTOR_URL is set, otherwise the shared on-disk store.
+
+if COLLECTOR_URL:
+    from python_scripts.sync_client import read, tail, version, version_key
+else:
+    from python_scripts.store import read, tail, version, version_key
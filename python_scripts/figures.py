@@ -0,0 +1,120 @@
+import json
+import threading
+
+import plotly.io as pio
+
+from python_scripts import datasets, artifacts
+
+# Figure registry. Each figure declares the store datasets it is built from;
+# it is only rebuilt when one of those datasets' version (manifest epoch and
+# seq, so a recreated dataset never matches) has moved since the cached copy
+# was built. Serialized JSON is cached alongside
+# the parsed figure so callers can serve whichever form they need.
+#
+# Entries are replaced whole, so readers only ever see a complete old or new
+# figure. Artifacts a previous run persisted to disk (artifacts.load()) carry
+# their input versions, so an unchanged figure is not rebuilt after a restart.
+
+FIGURES = {}
+
+_cache = {}
+_lock = threading.Lock()
+
+def register_figure(name, inputs):
+    def decorator(build):
+        FIGURES[name] = {"build": build, "inputs": list(inputs)}
+        return build
+    return decorator
+
+def input_versions(name):
+    return {key: datasets.version_key(key) for key in FIGURES[name]['inputs']}
+
+def build_figure(name, versions=None):
+    if versions is None:
+        versions = input_versions(name)
+
+    fig = FIGURES[name]['build']()
+    if hasattr(fig, 'return_fig'):
+        fig = fig.return_fig()
+
+    payload = pio.to_json(fig)
+    artifact = artifacts.publish(name, payload, versions)
+    entry = {
+        "versions": versions,
+        "json": payload,
+        "etag": artifact['etag'],
+        "figure": json.loads(payload)
+    }
+
+    with _lock:
+        _cache[name] = entry
+    return entry
+
+def _entry_from_artifact(name, artifact):
+    payload = artifacts.payload(name)
+    return {
+        "versions": artifact['versions'],
+        "json": payload,
+        "etag": artifact['etag'],
+        "figure": json.loads(payload)
+    }
+
+def get_figure(name):
+    """Return the cached figure entry, rebuilding it only if its inputs changed"""
+    versions = input_versions(name)
+    cached = _cache.get(name)
+    if cached is None:
+        # Reuse the artifact persisted by a previous run if it is still current
+        artifact = artifacts.get(name)
+        if artifact is not None and artifact['versions'] == versions:
+            cached = _entry_from_artifact(name, artifact)
+            with _lock:
+                _cache[name] = cached
+    if cached is not None and cached['versions'] == versions:
+        return cached
+
+    print(f'Rebuilding {name} for {versions}')
+    return build_figure(name, versions)
+
+def cached_figure(name):
+    """Return the last built entry without checking inputs (None if never built)"""
+    return _cache.get(name)
+
+_refresh_lock = threading.Lock()
+
+def refresh_figures(names=None):
+    refreshed = {}
+    for name in names or list(FIGURES):
+        try:
+            refreshed[name] = get_figure(name)
+        except Exception as e:
+            print(f'Failed to build {name}: {e}')
+    return refreshed
+
+def refresh_in_background(names=None, refresh=None):
+    """
+    Run a refresh on a daemon thread unless one is already running.
+
+    refresh defaults to refresh_figures(names). Cached figures keep being
+    served while it runs and are swapped in one by one as they finish.
+    Returns the thread, or None if a refresh was already in progress.
+    """
+
+    if not _refresh_lock.acquire(blocking=False):
+        print('Figure refresh already running, skipping')
+        return None
+
+    def run():
+        try:
+            if refresh is not None:
+                refresh()
+            else:
+                refresh_figures(names)
+        except Exception as e:
+            print(f'Background refresh failed: {e}')
+        finally:
+            _refresh_lock.release()
+
+    thread = threading.Thread(target=run, daemon=True, name='figure-refresh')
+    thread.start()
+    return thread
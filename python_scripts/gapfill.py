@@ -0,0 +1,111 @@
+import os
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from python_scripts import store
+
+load_dotenv()
+
+# Gap filling for datasets stored at a fixed granularity.
+#
+# Instead of resampling a dataset's history on every write, only the new rows
+# are put on the time grid. Each grid point labels the bin [point, point +
+# freq) and takes the latest row inside it, or the latest row before it when
+# the bin is empty, so quiet hours carry the stored value forward. Each series
+# (one per keep_subset value) is filled from the bin after its last stored row
+# up to the bin of its newest new row; a new row in the same bin as the last
+# stored row rewrites that bin, so off-grid updates are never dropped. The
+# lookup is a searchsorted over int64 timestamps and a take of the matching
+# rows. Stored rows are only read for the new rows' span plus
+# GAPFILL_LOOKBACK before it; a series silent for longer than that starts
+# again at the bin of its first new row.
+
+GAPFILL_LOOKBACK = pd.Timedelta(os.getenv('GAPFILL_LOOKBACK', '2D'))
+
+def _ns(values):
+    return np.asarray(values, dtype='datetime64[ns]').view('i8')
+
+def fill(new, stored, time_col, keep_subset, freq):
+    """
+    Grid rows for the span of `new`, forward filled from `stored`.
+
+    new and stored share the dataset's columns with naive datetimes in
+    time_col; rows in new replace stored rows with the same time and keys.
+    Returns one row per series and grid point, each holding the latest row
+    inside its bin, from the bin after the series' last stored row (or that
+    row's own bin when new rows share it) up to the bin of its last new row.
+    """
+
+    keep_cols = [time_col] + keep_subset
+    new = new.assign(_new=True)
+    combined = pd.concat([stored.assign(_new=False), new], ignore_index=True)
+    combined = combined.drop_duplicates(subset=keep_cols, keep='last')
+
+    if keep_subset:
+        codes = combined.groupby(keep_subset, sort=False, dropna=False).ngroup().to_numpy()
+    else:
+        codes = np.zeros(len(combined), dtype=np.int64)
+    times = _ns(combined[time_col])
+    is_new = combined['_new'].to_numpy()
+
+    # Rows sorted by series then time, so each series is one contiguous run
+    order = np.lexsort((times, codes))
+    codes, times, is_new = codes[order], times[order], is_new[order]
+    rows = combined.drop(columns='_new').iloc[order].reset_index(drop=True)
+
+    bounds = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(codes)]))
+
+    # One precomputed grid covering every series' span
+    new_times = times[is_new]
+    if not len(new_times):
+        return rows.iloc[0:0]
+    span_start = pd.Timestamp(times.min()).floor(freq)
+    span_end = pd.Timestamp(new_times.max()).floor(freq)
+    grid_index = pd.date_range(span_start, span_end, freq=freq)
+    grid = _ns(grid_index)
+    # Exclusive end of each grid point's bin
+    bin_ends = _ns(grid_index + pd.tseries.frequencies.to_offset(freq))
+
+    positions = []
+    grid_times = []
+    for start, end in zip(starts, ends):
+        series_times = times[start:end]
+        series_new = is_new[start:end]
+        if not series_new.any():
+            continue
+
+        first_new = series_times[series_new].min()
+        last_new = series_times[series_new].max()
+        earlier = series_times[~series_new & (series_times < first_new)]
+
+        # Bins from the one after the last stored row's, but never past the
+        # first new row's bin
+        first = np.searchsorted(grid, first_new, side='right') - 1
+        if len(earlier):
+            first = min(first, np.searchsorted(grid, earlier.max(), side='right'))
+        last = np.searchsorted(grid, last_new, side='right')
+
+        points = grid[first:last]
+        latest = np.searchsorted(series_times, bin_ends[first:last], side='left') - 1
+        positions.append(start + latest)
+        grid_times.append(points)
+
+    if not positions:
+        return rows.iloc[0:0]
+
+    positions = np.concatenate(positions)
+    filled = rows.take(positions).reset_index(drop=True)
+    filled[time_col] = pd.to_datetime(np.concatenate(grid_times))
+    return filled
+
+def fill_tail(key, new, time_col, keep_subset, freq, lookback=GAPFILL_LOOKBACK):
+    """Gap-fill new rows for a stored dataset, reading only the stored rows around them"""
+    start = new[time_col].min() - lookback
+    stored = store.read(key, start=start, end=new[time_col].max())
+    if stored.empty:
+        stored = new.iloc[0:0]
+    return fill(new, stored, time_col, keep_subset, freq)
@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import random
+import fnmatch
+import threading
+from urllib.parse import urlparse, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from python_scripts import metrics
+
+load_dotenv()
+
+# Shared HTTP layer for every API helper: one pooled keep-alive session,
+# gzip, bounded retries with jittered exponential backoff on 429/5xx and
+# connection errors, and a cap on concurrent requests per host. Responses,
+# body bytes and retries are counted per host in metrics.
+
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 30))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 4))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 30))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))
+HTTP_HOST_CONCURRENCY = int(os.getenv('HTTP_HOST_CONCURRENCY', 8))
+
+# e.g. HTTP_HOST_LIMITS="api.xrpscan.com=4,api.geckoterminal.com=2"
+HTTP_HOST_LIMITS = {
+    host.strip(): int(limit)
+    for host, limit in (
+        item.split('=') for item in os.getenv('HTTP_HOST_LIMITS', '').split(',') if '=' in item
+    )
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only these are retried by default; a retried POST may repeat its side effect
+RETRY_METHODS = {'GET', 'HEAD'}
+
+# Recorded responses to serve instead of the network (used by the benchmarks).
+# A JSON list of {"method", "url" (fnmatch pattern on the path), "status",
+# "body"} plus optional matchers: "query" ({param: value}) pinned against the
+# query string and params, "rpc_method" and "rpc_params" ({key: value})
+# pinned against a JSON-RPC body. Params an entry doesn't list are free, so
+# paginated endpoints get one entry per page keyed on the page params.
+HTTP_REPLAY_FILE = os.getenv('HTTP_REPLAY_FILE')
+
+_session = None
+_session_lock = threading.Lock()
+_host_semaphores = {}
+_replay = None
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive"
+                })
+                _session = session
+    return _session
+
+def _host_semaphore(url):
+    host = urlparse(url).netloc
+    with _session_lock:
+        if host not in _host_semaphores:
+            limit = HTTP_HOST_LIMITS.get(host, HTTP_HOST_CONCURRENCY)
+            _host_semaphores[host] = threading.BoundedSemaphore(limit)
+        return _host_semaphores[host]
+
+def _backoff_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    # Full jitter: uniform between 0 and the capped exponential step
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * (2 ** attempt)))
+
+def set_replay(path):
+    """Serve responses from a recorded fixture file (None goes back to the network)"""
+    global _replay
+    if path is None:
+        _replay = None
+        return
+    with open(path, 'r') as file:
+        _replay = json.load(file)
+
+def _replay_key(url, kwargs):
+    """The request's path, sorted query params and JSON-RPC method and params"""
+    path, _, query_string = url.partition('?')
+    query = parse_qsl(query_string) + [(str(k), str(v)) for k, v in (kwargs.get('params') or {}).items()]
+    body = kwargs.get('json') or {}
+    rpc_params = body.get('params') or [{}]
+    return path, dict(sorted(query)), body.get('method'), rpc_params[0] if isinstance(rpc_params[0], dict) else {}
+
+def _replay_response(method, url, kwargs):
+    path, query, rpc_method, rpc_params = _replay_key(url, kwargs)
+    for entry in _replay:
+        if entry.get('method', 'GET') != method or not fnmatch.fnmatch(path, entry['url']):
+            continue
+        if entry.get('rpc_method') not in (None, rpc_method):
+            continue
+        if any(query.get(k) != str(v) for k, v in entry.get('query', {}).items()):
+            continue
+        if any(rpc_params.get(k) != v for k, v in entry.get('rpc_params', {}).items()):
+            continue
+        response = requests.Response()
+        response.status_code = entry.get('status', 200)
+        response._content = json.dumps(entry['body']).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.url = url
+        return response
+    raise LookupError(f'No recorded response for {method} {path} (query {query}, rpc {rpc_method} {rpc_params})')
+
+def request(method, url, retries=HTTP_MAX_RETRIES, retry_post=False, **kwargs):
+    """
+    Send a request through the shared session.
+
+    GET and HEAD are retried on connection errors and RETRY_STATUSES. Other
+    methods are sent once unless retry_post is set, for POSTs that only read
+    (e.g. JSON-RPC result polling).
+    """
+    if _replay is not None:
+        return _replay_response(method, url, kwargs)
+
+    if method.upper() not in RETRY_METHODS and not retry_post:
+        retries = 0
+
+    kwargs.setdefault('timeout', HTTP_TIMEOUT)
+    session = get_session()
+    semaphore = _host_semaphore(url)
+    host = urlparse(url).netloc
+
+    for attempt in range(retries + 1):
+        try:
+            with semaphore:
+                response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                metrics.inc('http_requests_total', host=host, method=method, status='error')
+                raise
+            metrics.inc('http_retries_total', host=host, reason=type(e).__name__)
+            delay = _backoff_delay(attempt)
+            print(f'{method} {url} failed ({e}), retrying in {delay:.2f}s')
+            time.sleep(delay)
+            continue
+
+        metrics.inc('http_requests_total', host=host, method=method, status=response.status_code)
+        if not kwargs.get('stream'):
+            metrics.inc('http_response_bytes_total', len(response.content), host=host)
+
+        if response.status_code in RETRY_STATUSES and attempt < retries:
+            metrics.inc('http_retries_total', host=host, reason=response.status_code)
+            delay = _backoff_delay(attempt, response.headers.get('Retry-After'))
+            print(f'{method} {url} returned {response.status_code}, retrying in {delay:.2f}s')
+            time.sleep(delay)
+            continue
+
+        return response
+
+if HTTP_REPLAY_FILE:
+    set_replay(HTTP_REPLAY_FILE)
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
@@ -0,0 +1,117 @@
+import os
+import time
+import uuid
+import atexit
+import socket
+import sqlite3
+import threading
+from functools import wraps
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Leader lease so scheduled jobs run in exactly one process.
+#
+# Every process that schedules jobs competes for a named lease in a small
+# SQLite database. The holder renews it from a heartbeat thread; the others
+# keep trying and take over once it has gone LEADER_TTL seconds without a
+# renewal (e.g. the leader crashed). Jobs wrapped in leader_only() simply
+# skip in processes that don't hold the lease. SQLite locking needs every
+# process on the same host (or a filesystem with working locks).
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LEADER_DB = os.getenv('LEADER_DB', os.path.join(BASE_DIR, 'data', 'leader.sqlite'))
+LEADER_TTL = float(os.getenv('LEADER_TTL', 90))
+
+HOLDER = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+_heartbeats = {}
+_lock = threading.Lock()
+
+def _connect():
+    os.makedirs(os.path.dirname(LEADER_DB), exist_ok=True)
+    conn = sqlite3.connect(LEADER_DB, timeout=10, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS lease ("
+        "name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+    )
+    return conn
+
+def try_acquire(name, ttl=LEADER_TTL):
+    """Take or renew the lease; returns True if this process now holds it"""
+    now = time.time()
+    conn = _connect()
+    try:
+        # IMMEDIATE takes the write lock up front so two processes can't both
+        # see an expired lease and claim it
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT holder, expires_at FROM lease WHERE name = ?', (name,)).fetchone()
+        if row is not None and row[0] != HOLDER and row[1] > now:
+            conn.execute('ROLLBACK')
+            return False
+        conn.execute(
+            'INSERT OR REPLACE INTO lease (name, holder, expires_at) VALUES (?, ?, ?)',
+            (name, HOLDER, now + ttl)
+        )
+        conn.execute('COMMIT')
+        if row is None or row[0] != HOLDER:
+            print(f'{HOLDER} acquired the {name} lease')
+        return True
+    except sqlite3.Error as e:
+        print(f'lease {name} check failed: {e}')
+        return False
+    finally:
+        conn.close()
+
+def release(name):
+    conn = _connect()
+    try:
+        conn.execute('DELETE FROM lease WHERE name = ? AND holder = ?', (name, HOLDER))
+    finally:
+        conn.close()
+
+def holder(name):
+    """Current holder of the lease, or None if it is free or expired"""
+    conn = _connect()
+    try:
+        row = conn.execute('SELECT holder, expires_at FROM lease WHERE name = ?', (name,)).fetchone()
+    finally:
+        conn.close()
+    if row is None or row[1] <= time.time():
+        return None
+    return row[0]
+
+def is_leader(name):
+    return holder(name) == HOLDER
+
+def start_heartbeat(name, ttl=LEADER_TTL):
+    """Keep competing for the lease in the background; renews it while held"""
+    with _lock:
+        if name in _heartbeats:
+            return _heartbeats[name]
+
+        def beat():
+            while True:
+                try_acquire(name, ttl)
+                time.sleep(ttl / 3)
+
+        thread = threading.Thread(target=beat, daemon=True, name=f'lease-{name}')
+        thread.start()
+        _heartbeats[name] = thread
+
+    atexit.register(release, name)
+    return thread
+
+def leader_only(name):
+    """Run the wrapped job only in the process holding the lease"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not try_acquire(name):
+                print(f'{func.__name__} skipped: {name} lease held by {holder(name)}')
+                return None
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
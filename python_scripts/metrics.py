@@ -0,0 +1,109 @@
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# In-process instrumentation for the collector.
+#
+# Counters and step timings live in plain dicts keyed by metric name and label
+# values, and render() writes them out in the Prometheus text format for the
+# collector's /metrics endpoint. Step timings are summaries (a _sum and a
+# _count per step) plus the time of each step's last success, so a scrape
+# shows where the hourly and daily jobs spend their time and when each part
+# last worked. Everything is per process; each worker exposes its own numbers.
+
+PREFIX = 'rlusd'
+
+HELP = {
+    "step_seconds": ("summary", "Wall time of collector steps (job, stage, fetch, transform, store)"),
+    "step_failures_total": ("counter", "Collector steps that raised"),
+    "step_last_success_timestamp_seconds": ("gauge", "Unix time of each step's last successful run"),
+    "http_requests_total": ("counter", "HTTP responses received, by host, method and status"),
+    "http_response_bytes_total": ("counter", "Response body bytes received, by host"),
+    "http_retries_total": ("counter", "HTTP requests retried, by host and reason"),
+    "source_cache_total": ("counter", "Source cache lookups, by result"),
+    "rows_written_total": ("counter", "Rows appended to the store, by dataset"),
+}
+
+_counters = {}
+_gauges = {}
+_lock = threading.Lock()
+
+def _key(metric, labels):
+    return metric, tuple(sorted(labels.items()))
+
+def inc(metric, value=1, **labels):
+    key = _key(metric, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def set_gauge(metric, value, **labels):
+    with _lock:
+        _gauges[_key(metric, labels)] = value
+
+def observe(step, name, seconds, failed=False):
+    """Record one run of a step that took `seconds`"""
+    inc('step_seconds_sum', seconds, step=step, name=name)
+    inc('step_seconds_count', step=step, name=name)
+    if failed:
+        inc('step_failures_total', step=step, name=name)
+    else:
+        set_gauge('step_last_success_timestamp_seconds', time.time(), step=step, name=name)
+
+@contextmanager
+def timed(step, name):
+    """Time a block (or, as a decorator, a function) as one run of step/name"""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe(step, name, time.perf_counter() - started, failed=True)
+        raise
+    observe(step, name, time.perf_counter() - started)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _line(name, labels, value):
+    label_text = ','.join(f'{label}="{_escape(val)}"' for label, val in labels)
+    label_text = f'{{{label_text}}}' if label_text else ''
+    return f'{PREFIX}_{name}{label_text} {value}'
+
+def _family(name):
+    # step_seconds_sum and step_seconds_count belong to the step_seconds summary
+    for suffix in ('_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in HELP:
+            return name[:-len(suffix)]
+    return name
+
+def _source_cache_samples():
+    # Only reported once something has imported the cache; read at scrape time
+    source_cache = sys.modules.get('python_scripts.source_cache')
+    if source_cache is None:
+        return {}
+    return {_key('source_cache_total', {"result": result}): count
+            for result, count in source_cache.stats.items()}
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        samples = {**_counters, **_gauges}
+    samples.update(_source_cache_samples())
+
+    families = {}
+    for (name, labels), value in samples.items():
+        families.setdefault(_family(name), []).append((name, labels, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, description = HELP.get(family, ('untyped', ''))
+        lines.append(f'# HELP {PREFIX}_{family} {description}')
+        lines.append(f'# TYPE {PREFIX}_{family} {kind}')
+        for name, labels, value in sorted(families[family], key=lambda sample: (sample[1], sample[0])):
+            lines.append(_line(name, labels, value))
+    return '\n'.join(lines) + '\n'
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
@@ -0,0 +1,103 @@
+import os
+import json
+import datetime as dt
+
+from web3 import Web3
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Batched on-chain reads through Multicall3. Every call in a snapshot is
+# executed in one eth_call against a single pinned block, so the supply and
+# pool balances it returns are consistent with each other.
+
+ETHEREUM_GATEWAY = os.getenv('ETHEREUM_GATEWAY')
+MULTICALL3_ADDRESS = Web3.to_checksum_address(
+    os.getenv('MULTICALL3_ADDRESS', '0xcA11bde05977b3631167028862bE2a173976CA11')
+)
+MULTICALL_BATCH_SIZE = int(os.getenv('MULTICALL_BATCH_SIZE', 200))
+
+erc20_abi_path = 'abi/erc20_abi.json'
+multicall3_abi_path = 'abi/multicall3_abi.json'
+
+abis = {}
+for path in [erc20_abi_path, multicall3_abi_path]:
+    with open(path, "r") as file:
+        abis[path] = json.load(file)
+
+_w3 = None
+
+def get_w3():
+    global _w3
+    if _w3 is None:
+        _w3 = Web3(Web3.HTTPProvider(ETHEREUM_GATEWAY))
+    return _w3
+
+def multicall(calls, block='latest', w3=None):
+    """
+    Execute read calls through Multicall3.aggregate3 at one block.
+
+    calls is a list of (target, calldata, output_types). Returns the decoded
+    outputs in the same order; a call that reverts comes back as None instead
+    of failing the batch. Large call lists are split into
+    MULTICALL_BATCH_SIZE chunks, all pinned to the same block.
+    """
+
+    w3 = w3 or get_w3()
+    multicall3 = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=abis[multicall3_abi_path])
+
+    results = []
+    for i in range(0, len(calls), MULTICALL_BATCH_SIZE):
+        batch = calls[i:i + MULTICALL_BATCH_SIZE]
+        payload = [(Web3.to_checksum_address(target), True, calldata) for target, calldata, _ in batch]
+        returned = multicall3.functions.aggregate3(payload).call(block_identifier=block)
+
+        for (_, _, output_types), (success, data) in zip(batch, returned):
+            if not success or not data:
+                results.append(None)
+                continue
+            decoded = w3.codec.decode(output_types, data)
+            results.append(decoded[0] if len(decoded) == 1 else decoded)
+
+    return results
+
+def erc20_snapshot(token, holders=(), block=None, w3=None):
+    """
+    totalSupply, decimals and balanceOf(holder) for an ERC-20 in one round trip.
+
+    block defaults to the latest block number, fetched once so every value
+    (including the block timestamp) is read at the same height. Amounts are
+    scaled by the token's decimals.
+    """
+
+    w3 = w3 or get_w3()
+    if block is None:
+        block = w3.eth.block_number
+
+    token = Web3.to_checksum_address(token)
+    erc20 = w3.eth.contract(address=token, abi=abis[erc20_abi_path])
+    multicall3 = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=abis[multicall3_abi_path])
+
+    calls = [
+        (MULTICALL3_ADDRESS, multicall3.encode_abi('getCurrentBlockTimestamp'), ['uint256']),
+        (token, erc20.encode_abi('decimals'), ['uint8']),
+        (token, erc20.encode_abi('totalSupply'), ['uint256']),
+    ]
+    calls += [
+        (token, erc20.encode_abi('balanceOf', args=[Web3.to_checksum_address(holder)]), ['uint256'])
+        for holder in holders
+    ]
+
+    timestamp, decimals, total_supply, *balances = multicall(calls, block=block, w3=w3)
+    scale = 10 ** (decimals if decimals is not None else 18)
+
+    return {
+        "block": block,
+        "timestamp": dt.datetime.fromtimestamp(timestamp, dt.timezone.utc) if timestamp is not None else None,
+        "decimals": decimals,
+        "total_supply": total_supply / scale if total_supply is not None else None,
+        "balances": {
+            holder.lower(): balance / scale if balance is not None else None
+            for holder, balance in zip(holders, balances)
+        }
+    }
@@ -0,0 +1,126 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+
+from python_scripts import metrics
+
+load_dotenv()
+
+SOURCE_TIMEOUT = float(os.getenv('SOURCE_TIMEOUT', 30))
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 4))
+
+def fan_out(sources, timeout=SOURCE_TIMEOUT, max_workers=None):
+    """
+    Run independent source calls in parallel and return whatever finished in time.
+
+    sources maps a name to either a callable or a (callable, timeout) tuple.
+    Every source gets its own deadline measured from when the fan-out started;
+    sources that raise or miss their deadline come back as None so callers can
+    still use the partial result.
+    """
+
+    calls = {}
+    for name, source in sources.items():
+        if isinstance(source, tuple):
+            func, source_timeout = source
+        else:
+            func, source_timeout = source, timeout
+        calls[name] = (func, source_timeout)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(calls) or 1)
+    started = time.monotonic()
+    futures = {name: executor.submit(metrics.timed('fetch', name)(func)) for name, (func, _) in calls.items()}
+
+    results = {}
+    for name, future in futures.items():
+        remaining = calls[name][1] - (time.monotonic() - started)
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            print(f'{name} timed out after {calls[name][1]}s')
+            future.cancel()
+            results[name] = None
+        except Exception as e:
+            print(f'{name} call failed: {e}')
+            results[name] = None
+
+    # Slow sources keep running in the background; don't block on them
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f'fan_out finished {list(results)} in {time.monotonic() - started:.2f}s')
+    return results
+
+class StageError(Exception):
+    """A stage's exception with the time it ran for before raising"""
+
+    def __init__(self, error, seconds):
+        super().__init__(str(error))
+        self.error = error
+        self.seconds = seconds
+
+def _timed_call(func, kwargs):
+    started = time.perf_counter()
+    try:
+        result = func(**kwargs)
+    except Exception as e:
+        raise StageError(e, time.perf_counter() - started) from e
+    return result, time.perf_counter() - started
+
+def run_stages(stages, max_workers=PIPELINE_WORKERS):
+    """
+    Run a small DAG of stages on a worker pool.
+
+    stages maps a stage name to (func, [dependency names]). A stage starts as
+    soon as all of its dependencies have finished and is called with their
+    results as keyword arguments named after them. A failed stage only skips
+    the stages that depend on it. Stages run on threads: they are I/O bound
+    and share the store, whose lock is only held within this process.
+
+    Returns (results, report) where report holds each stage's status and
+    wall time; both are also recorded in metrics.
+    """
+
+    results = {}
+    report = {}
+    pending = dict(stages)
+    running = {}
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for name, (func, deps) in list(pending.items()):
+                if any(report.get(dep, {}).get('status') in ('failed', 'skipped') for dep in deps):
+                    report[name] = {"status": "skipped", "seconds": 0.0}
+                    del pending[name]
+                elif all(dep in results for dep in deps):
+                    kwargs = {dep: results[dep] for dep in deps}
+                    running[pool.submit(_timed_call, func, kwargs)] = name
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    # Remaining stages depend on something that never ran
+                    for name in pending:
+                        report[name] = {"status": "skipped", "seconds": 0.0}
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], seconds = future.result()
+                    report[name] = {"status": "ok", "seconds": round(seconds, 3)}
+                    metrics.observe('stage', name, seconds)
+                except StageError as e:
+                    print(f'stage {name} failed: {e}')
+                    metrics.observe('stage', name, e.seconds, failed=True)
+                    report[name] = {"status": "failed", "seconds": round(e.seconds, 3), "error": str(e)}
+
+    total = time.perf_counter() - started
+    for name, entry in report.items():
+        print(f"stage {name}: {entry['status']} ({entry['seconds']}s)")
+    print(f'pipeline finished in {total:.2f}s')
+
+    return results, report
@@ -0,0 +1,136 @@
+import pandas as pd
+
+from python_scripts import store
+
+# Materialized rollups maintained as rows land in the store.
+#
+# For every raw key listed in ROLLUPS, each append recomputes only the
+# periods it touched and upserts them into '<key>_<freq>' datasets:
+#   last:   last non-null value per series in the period, summed over `group`
+#   sum:    summed over the period and `group`
+# Grouped sum columns also keep a running '<key>_total' per group, adjusted by the
+# change in the touched daily periods, so totals never rescan history.
+
+FREQS = {
+    'hourly': 'h',
+    'daily': 'D',
+    'weekly': 'W',
+}
+
+# Stored at a fixed timestamp so the store's upsert keeps one row per group
+TOTAL_DT = pd.Timestamp('1970-01-01')
+
+ROLLUPS = {
+    'timeseries': {
+        "time_col": "hour",
+        "series": [],
+        "group": [],
+        "last": ['xrp_bal', 'rlusd_bal', 'RLUSD_XRPL_Supply', 'RLUSD_ETH_Supply'],
+        "sum": [],
+        "freqs": ['hourly', 'daily', 'weekly'],
+    },
+    'eth_lp_hourly': {
+        "time_col": "dt",
+        "series": ['pool', 'symbol'],
+        "group": ['symbol'],
+        "last": ['current_bal', 'tvl'],
+        "sum": [],
+        "freqs": ['daily', 'weekly'],
+    },
+    'dex_data': {
+        "time_col": "dt",
+        "series": ['blockchain'],
+        "group": ['blockchain'],
+        "last": [],
+        "sum": ['volume'],
+        "freqs": ['daily', 'weekly'],
+    },
+}
+
+def period_start(times, freq):
+    times = pd.to_datetime(times)
+    if freq == 'W':
+        # Weeks start on Monday
+        return (times - pd.to_timedelta(times.dt.weekday, unit='D')).dt.floor('D')
+    return times.dt.floor(freq)
+
+def _period_end(start, freq):
+    if freq == 'W':
+        return start + pd.Timedelta(days=7)
+    return start + pd.Timedelta(1, unit=freq)
+
+def aggregate(raw, spec, freq):
+    """Aggregate raw rows into one row per period (dt) and group"""
+    time_col = spec['time_col']
+    group = spec['group']
+
+    df = raw.sort_values(time_col, kind='stable').copy()
+    df['dt'] = period_start(df[time_col], freq)
+
+    frames = []
+    if spec['last']:
+        last = (
+            df.groupby(['dt'] + spec['series'])[spec['last']].last()
+            .groupby(['dt'] + group)[spec['last']].sum(min_count=1)
+        )
+        frames.append(last)
+    if spec['sum']:
+        frames.append(df.groupby(['dt'] + group)[spec['sum']].sum())
+
+    return pd.concat(frames, axis=1).reset_index()
+
+def _update_totals(key, spec, old_daily, new_daily):
+    group = spec['group']
+    cols = spec['sum']
+
+    new = new_daily.set_index(['dt'] + group)[cols]
+    old = old_daily.set_index(['dt'] + group)[cols] if not old_daily.empty else new.iloc[0:0]
+    change = new.sub(old.reindex(new.index), fill_value=0).groupby(level=group).sum()
+
+    totals = store.read(f'{key}_total')
+    if not totals.empty:
+        change = change.add(totals.set_index(group)[cols], fill_value=0)
+
+    change = change.reset_index()
+    change['dt'] = TOTAL_DT
+    store.append(f'{key}_total', change, time_col='dt', keep_subset=group, partition='M')
+
+def update_rollups(key, new_rows):
+    """Recompute the rollup periods touched by new_rows for a raw dataset"""
+    spec = ROLLUPS.get(key)
+    if spec is None or new_rows.empty:
+        return
+
+    time_col = spec['time_col']
+    new_times = pd.to_datetime(new_rows[time_col], utc=True).dt.tz_convert(None)
+
+    for name in spec['freqs']:
+        freq = FREQS[name]
+        touched = period_start(new_times, freq)
+        start = touched.min()
+        end = _period_end(touched.max(), freq) - pd.Timedelta(microseconds=1)
+
+        raw = store.read(key, start=start, end=end)
+        if raw.empty:
+            continue
+
+        rolled = aggregate(raw, spec, freq)
+        rolled = rolled[rolled['dt'].isin(touched.unique())]
+
+        rollup_key = f'{key}_{name}'
+        if name == 'daily' and spec['sum'] and spec['group']:
+            old_daily = store.read(rollup_key, start=start, end=end)
+            _update_totals(key, spec, old_daily, rolled)
+
+        store.append(rollup_key, rolled, time_col='dt', keep_subset=spec['group'],
+                     partition='D' if name == 'hourly' else 'M')
+
+def rebuild_rollups(key):
+    """Drop and recompute every rollup of a raw dataset from its full history"""
+    spec = ROLLUPS[key]
+    for name in spec['freqs']:
+        store.clear(f'{key}_{name}')
+    store.clear(f'{key}_total')
+
+    raw = store.read(key)
+    update_rollups(key, raw)
@@ -0,0 +1,127 @@
+import os
+import threading
+from functools import wraps
+
+import pandas as pd
+from cachetools.keys import hashkey
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Memoization for the network fetchers in apis.py.
+#
+# Results are keyed by source name and call arguments and held in a cachetools
+# TTLCache, so each source gets its cache's TTL and the least recently used
+# entries are evicted once it is full. Concurrent identical calls are
+# collapsed into one (single-flight): the first caller fetches, the rest wait
+# for its result. With SOURCE_CACHE_DIR set, results are also written through
+# to a diskcache directory so a restarted process reuses them until they
+# expire. Failed fetches (None results) are never cached.
+
+SOURCE_CACHE_DIR = os.getenv('SOURCE_CACHE_DIR')
+
+# id(cache) -> (cache, lock) for every TTLCache a fetcher is cached in
+_caches = {}
+_inflight = {}
+_inflight_lock = threading.Lock()
+_disk = None
+
+stats = {"hits": 0, "misses": 0, "disk_hits": 0, "shared": 0}
+
+def _disk_cache():
+    global _disk
+    if _disk is None and SOURCE_CACHE_DIR:
+        from diskcache import Cache
+        _disk = Cache(SOURCE_CACHE_DIR)
+    return _disk
+
+def _cacheable(result):
+    if result is None:
+        return False
+    if isinstance(result, tuple):
+        return all(item is not None for item in result)
+    return True
+
+def _copy(result):
+    # Callers mutate DataFrames in place; hand each one its own copy
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    if isinstance(result, tuple):
+        return tuple(_copy(item) for item in result)
+    return result
+
+def _single_flight(key, fetch):
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = {"event": threading.Event(), "result": None, "error": None}
+            _inflight[key] = call
+
+    if not leader:
+        stats['shared'] += 1
+        call['event'].wait()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result']
+
+    try:
+        call['result'] = fetch()
+    except Exception as e:
+        call['error'] = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call['event'].set()
+    return call['result']
+
+def source_cached(cache, name=None):
+    """Cache a fetcher in the given TTLCache, keyed by its arguments"""
+    _, lock = _caches.setdefault(id(cache), (cache, threading.Lock()))
+
+    def decorator(func):
+        source = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = hashkey(source, *args, **kwargs)
+
+            with lock:
+                if key in cache:
+                    stats['hits'] += 1
+                    return _copy(cache[key])
+
+            disk = _disk_cache()
+            disk_key = repr(key)
+            if disk is not None:
+                result = disk.get(disk_key)
+                if result is not None:
+                    stats['disk_hits'] += 1
+                    with lock:
+                        cache[key] = result
+                    return _copy(result)
+
+            def fetch():
+                stats['misses'] += 1
+                result = func(*args, **kwargs)
+                if _cacheable(result):
+                    with lock:
+                        cache[key] = result
+                    if disk is not None:
+                        disk.set(disk_key, result, expire=cache.ttl)
+                return result
+
+            return _copy(_single_flight(key, fetch))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def clear():
+    for cache, lock in _caches.values():
+        with lock:
+            cache.clear()
+    disk = _disk_cache()
+    if disk is not None:
+        disk.clear()
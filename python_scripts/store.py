@@ -0,0 +1,426 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Partitioned, append-only time-series store.
+#
+# Layout on disk:
+#   STORE_DIR/<key>/manifest.json
+#   STORE_DIR/<key>/<partition>/<seq>.parquet
+#
+# Every append writes one small Parquet segment per partition it touches and
+# bumps the manifest. Duplicates (same time_col + keep_subset) are resolved on
+# read, keeping the row from the highest seq. A partition is compacted back to
+# a single segment once it holds more than MAX_SEGMENTS, so the cost of an
+# append is bounded by the size of one partition, not the whole history.
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STORE_DIR = os.getenv('STORE_DIR', os.path.join(BASE_DIR, 'data', 'store'))
+MAX_SEGMENTS = int(os.getenv('STORE_MAX_SEGMENTS', 24))
+
+PARTITION_FORMATS = {
+    'D': '%Y-%m-%d',
+    'M': '%Y-%m',
+}
+
+# Every row carries the seq of the append that wrote it, so readers can ask
+# for just the rows that changed since a seq they already hold
+SEQ_COL = '_seq'
+
+# Dataset keys name directories under STORE_DIR, so they are kept to plain names
+KEY_PATTERN = re.compile(r'[A-Za-z0-9_]+')
+
+_lock = threading.RLock()
+
+def valid_key(key):
+    return isinstance(key, str) and KEY_PATTERN.fullmatch(key) is not None
+
+def _key_dir(key):
+    if not valid_key(key):
+        raise ValueError(f'Invalid dataset key: {key!r}')
+    return os.path.join(STORE_DIR, key)
+
+def _manifest_path(key):
+    return os.path.join(_key_dir(key), 'manifest.json')
+
+def load_manifest(key):
+    path = _manifest_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def _write_manifest(key, manifest):
+    path = _manifest_path(key)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp_path, path)
+
+def _new_manifest(key, time_col, keep_subset, partition):
+    return {
+        "key": key,
+        "time_col": time_col,
+        "keep_subset": list(keep_subset),
+        "partition": partition,
+        # Changes whenever the dataset is recreated (e.g. after clear or a
+        # rollup rebuild), so readers holding seqs from before know to start over
+        "epoch": uuid.uuid4().hex,
+        "seq": 0,
+        "columns": [],
+        # Latest time per keep_subset group, so a group's last row can be
+        # found without scanning back through the partitions
+        "last_times": {},
+        "partitions": {}
+    }
+
+def _group_times(df, time_col, keep_subset):
+    """Latest time per keep_subset group, keyed by the group's JSON-encoded values"""
+    if not keep_subset:
+        return {"[]": df[time_col].max().isoformat()} if not df.empty else {}
+    last = df.groupby(keep_subset, dropna=False)[time_col].max()
+    if len(keep_subset) == 1:
+        return {json.dumps([str(group)]): ts.isoformat() for group, ts in last.items()}
+    return {json.dumps([str(value) for value in group]): ts.isoformat() for group, ts in last.items()}
+
+def _scan_last_times(key, manifest):
+    # For manifests written before per-group times were kept
+    last_times = {}
+    for _, df in iter_partitions(key, columns=[]):
+        for group, ts in _group_times(df, manifest['time_col'], manifest['keep_subset']).items():
+            last_times[group] = max(last_times.get(group, ts), ts)
+    return last_times
+
+def _to_utc_naive(series):
+    series = pd.to_datetime(series, utc=True)
+    return series.dt.tz_convert(None)
+
+def _write_segment(key, partition_id, seq, df):
+    partition_dir = os.path.join(_key_dir(key), partition_id)
+    os.makedirs(partition_dir, exist_ok=True)
+    file_name = f'{seq:012d}.parquet'
+    tmp_path = os.path.join(partition_dir, f'{file_name}.tmp')
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(partition_dir, file_name))
+    return file_name
+
+def _segment_entry(file_name, seq, df, time_col):
+    return {
+        "file": file_name,
+        "seq": seq,
+        "rows": len(df),
+        "min": df[time_col].min().isoformat(),
+        "max": df[time_col].max().isoformat()
+    }
+
+def _dedupe(df, manifest):
+    keep_cols = [manifest['time_col']] + manifest['keep_subset']
+    return df.drop_duplicates(subset=keep_cols, keep='last')
+
+def _with_keep_cols(manifest, columns):
+    if columns is None:
+        return None
+    keep_cols = [manifest['time_col']] + manifest['keep_subset']
+    return keep_cols + [col for col in columns if col not in keep_cols]
+
+def _read_partition(key, partition_id, segments, columns=None, with_seq=False):
+    frames = []
+    for segment in segments:
+        path = os.path.join(_key_dir(key), partition_id, segment['file'])
+        if with_seq:
+            df = pd.read_parquet(path)
+            if SEQ_COL not in df:
+                # Segments written before row sequence numbers were tracked
+                df[SEQ_COL] = segment['seq']
+            if columns is not None:
+                df = df[[col for col in columns if col in df] + [SEQ_COL]]
+        elif columns is not None:
+            # Older segments may predate a column; it comes back as nulls
+            available = pq.read_schema(path).names
+            df = pd.read_parquet(path, columns=[col for col in columns if col in available])
+            df = df.reindex(columns=columns)
+        else:
+            df = pd.read_parquet(path)
+            df = df.drop(columns=[SEQ_COL], errors='ignore')
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+def compact(key, partition_id):
+    """Merge all segments of one partition into a single deduplicated segment"""
+    with _lock:
+        manifest = load_manifest(key)
+        if manifest is None or partition_id not in manifest['partitions']:
+            return
+
+        segments = manifest['partitions'][partition_id]['segments']
+        if len(segments) <= 1:
+            return
+
+        df = _dedupe(_read_partition(key, partition_id, segments, with_seq=True), manifest)
+        df = df.sort_values(manifest['time_col']).reset_index(drop=True)
+
+        seq = segments[-1]['seq']
+        file_name = f'{seq:012d}.parquet'
+        partition_dir = os.path.join(_key_dir(key), partition_id)
+        tmp_path = os.path.join(partition_dir, f'compact-{file_name}.tmp')
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(partition_dir, file_name))
+
+        manifest['partitions'][partition_id]['segments'] = [
+            _segment_entry(file_name, seq, df, manifest['time_col'])
+        ]
+        _write_manifest(key, manifest)
+
+        for segment in segments:
+            if segment['file'] != file_name:
+                try:
+                    os.remove(os.path.join(partition_dir, segment['file']))
+                except FileNotFoundError:
+                    pass
+
+def append(key, data, time_col='dt', keep_subset=None, partition='D'):
+    """Append rows to a dataset, writing one segment per touched partition"""
+    if keep_subset is None:
+        keep_subset = []
+
+    if isinstance(data, pd.DataFrame):
+        new_data = data.copy()
+    elif isinstance(data, dict):
+        new_data = pd.DataFrame([data])
+    else:
+        raise TypeError('Pass a DataFrame or dict for data')
+
+    if new_data.empty:
+        return load_manifest(key)
+
+    new_data[time_col] = _to_utc_naive(new_data[time_col])
+    new_data = new_data.dropna(subset=[time_col])
+
+    with _lock:
+        manifest = load_manifest(key)
+        if manifest is None:
+            os.makedirs(_key_dir(key), exist_ok=True)
+            manifest = _new_manifest(key, time_col, keep_subset, partition)
+        elif manifest['time_col'] != time_col or manifest['keep_subset'] != list(keep_subset):
+            raise ValueError(
+                f"{key} is stored with time_col={manifest['time_col']} keep_subset={manifest['keep_subset']}"
+            )
+
+        manifest.setdefault('epoch', uuid.uuid4().hex)
+        if 'last_times' not in manifest:
+            manifest['last_times'] = _scan_last_times(key, manifest)
+        for group, ts in _group_times(new_data, time_col, keep_subset).items():
+            manifest['last_times'][group] = max(manifest['last_times'].get(group, ts), ts)
+        known = manifest.get('columns') or columns(key)
+        manifest['columns'] = known + [col for col in new_data.columns if col not in known]
+
+        partition_format = PARTITION_FORMATS[manifest['partition']]
+        partition_ids = new_data[time_col].dt.strftime(partition_format)
+        to_compact = []
+
+        for partition_id, part in new_data.groupby(partition_ids, sort=True):
+            manifest['seq'] += 1
+            seq = manifest['seq']
+            part = part.drop_duplicates(subset=[time_col] + list(keep_subset), keep='last')
+            part[SEQ_COL] = seq
+            file_name = _write_segment(key, partition_id, seq, part)
+            entry = manifest['partitions'].setdefault(partition_id, {"segments": []})
+            entry['segments'].append(_segment_entry(file_name, seq, part, time_col))
+            if len(entry['segments']) > MAX_SEGMENTS:
+                to_compact.append(partition_id)
+
+        manifest['partitions'] = dict(sorted(manifest['partitions'].items()))
+        _write_manifest(key, manifest)
+
+        for partition_id in to_compact:
+            compact(key, partition_id)
+
+        return load_manifest(key)
+
+def first_time(key):
+    """Earliest stored time of a dataset, or None when it has no rows"""
+    manifest = load_manifest(key)
+    if manifest is None or not manifest['partitions']:
+        return None
+    entry = next(iter(manifest['partitions'].values()))
+    return min(pd.Timestamp(segment['min']) for segment in entry['segments'])
+
+def prepend(key, data, time_col='dt', keep_subset=None, partition='D'):
+    """
+    Append only the rows older than anything already stored.
+
+    For importing history kept elsewhere: stored rows always win, since an
+    imported row at the same time would otherwise replace them.
+    """
+    data = data.copy()
+    data[time_col] = _to_utc_naive(data[time_col])
+    with _lock:
+        first = first_time(key)
+        if first is not None:
+            data = data[data[time_col] < first]
+        if data.empty:
+            return data
+        append(key, data, time_col=time_col, keep_subset=keep_subset, partition=partition)
+        return data
+
+def _as_naive(ts):
+    if ts is None:
+        return None
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+def iter_partitions(key, start=None, end=None, columns=None, after_partition=None):
+    """
+    Yield (partition_id, DataFrame) one partition at a time, deduplicated,
+    sorted and limited to [start, end]. Partitions are disjoint in time, so
+    memory stays bounded by the largest partition.
+    """
+    manifest = load_manifest(key)
+    if manifest is None:
+        return
+
+    time_col = manifest['time_col']
+    start = _as_naive(start)
+    end = _as_naive(end)
+    columns = _with_keep_cols(manifest, columns)
+
+    for partition_id, entry in manifest['partitions'].items():
+        if after_partition is not None and partition_id < after_partition:
+            continue
+
+        segments = [
+            segment for segment in entry['segments']
+            if (start is None or pd.Timestamp(segment['max']) >= start)
+            and (end is None or pd.Timestamp(segment['min']) <= end)
+        ]
+        if not segments:
+            continue
+
+        df = _dedupe(_read_partition(key, partition_id, segments, columns=columns), manifest)
+        if start is not None:
+            df = df[df[time_col] >= start]
+        if end is not None:
+            df = df[df[time_col] <= end]
+        if df.empty:
+            continue
+
+        yield partition_id, df.sort_values(time_col, kind='stable').reset_index(drop=True)
+
+def read(key, start=None, end=None, columns=None):
+    """Load a dataset, optionally limited to [start, end] on its time column"""
+    frames = [df for _, df in iter_partitions(key, start=start, end=end, columns=columns)]
+
+    if not frames:
+        return pd.DataFrame()
+
+    return pd.concat(frames, ignore_index=True)
+
+def tail(key, columns=None):
+    """Load only the most recent partition of a dataset"""
+    manifest = load_manifest(key)
+    if manifest is None or not manifest['partitions']:
+        return pd.DataFrame()
+
+    partition_id, entry = list(manifest['partitions'].items())[-1]
+    columns = _with_keep_cols(manifest, columns)
+    df = _read_partition(key, partition_id, entry['segments'], columns=columns)
+    df = _dedupe(df, manifest)
+    return df.sort_values(manifest['time_col'], kind='stable').reset_index(drop=True)
+
+def last_rows(key, columns=None):
+    """
+    The rows at each keep_subset group's latest time, however far back that is.
+
+    Only the partitions holding those times are read.
+    """
+    manifest = load_manifest(key)
+    if manifest is None or not manifest['partitions']:
+        return pd.DataFrame()
+
+    last_times = manifest.get('last_times')
+    if last_times is None:
+        last_times = _scan_last_times(key, manifest)
+    time_col = manifest['time_col']
+    keep_subset = manifest['keep_subset']
+    times = sorted({pd.Timestamp(ts) for ts in last_times.values()})
+    if not times:
+        return pd.DataFrame()
+    df = pd.concat([read(key, start=ts, end=ts, columns=columns) for ts in times], ignore_index=True)
+    if df.empty:
+        return df
+
+    if keep_subset:
+        groups = df[keep_subset].astype(str).apply(lambda row: json.dumps(list(row)), axis=1)
+    else:
+        groups = pd.Series('[]', index=df.index)
+    df = df[df[time_col] == pd.to_datetime(groups.map(last_times))]
+    return df.sort_values(keep_subset + [time_col], kind='stable').reset_index(drop=True)
+
+def columns(key):
+    """Every column stored for a dataset (read from the segments for older manifests)"""
+    manifest = load_manifest(key)
+    if manifest is None:
+        return []
+    if manifest.get('columns'):
+        return list(manifest['columns'])
+
+    names = []
+    for partition_id, entry in manifest['partitions'].items():
+        for segment in entry['segments']:
+            path = os.path.join(_key_dir(key), partition_id, segment['file'])
+            names += [name for name in pq.read_schema(path).names if name not in names and name != SEQ_COL]
+    return names
+
+def version(key):
+    manifest = load_manifest(key)
+    return 0 if manifest is None else manifest['seq']
+
+def version_key(key):
+    """Epoch and seq; unlike the seq alone, it changes when the dataset is recreated"""
+    manifest = load_manifest(key)
+    return ':0' if manifest is None else f"{manifest.get('epoch', '')}:{manifest['seq']}"
+
+def changes(key, since=0, columns=None):
+    """
+    Rows written after seq `since`, deduplicated, plus the dataset's current seq.
+
+    Only segments whose seq is above `since` are read, so the cost follows the
+    amount of new data rather than the length of the history.
+    """
+    manifest = load_manifest(key)
+    if manifest is None:
+        return pd.DataFrame(), 0
+
+    columns = _with_keep_cols(manifest, columns)
+
+    frames = []
+    for partition_id, entry in manifest['partitions'].items():
+        segments = [segment for segment in entry['segments'] if segment['seq'] > since]
+        if not segments:
+            continue
+        df = _read_partition(key, partition_id, segments, columns=columns, with_seq=True)
+        frames.append(df[df[SEQ_COL] > since])
+
+    if not frames:
+        return pd.DataFrame(), manifest['seq']
+
+    df = pd.concat(frames, ignore_index=True).sort_values(SEQ_COL, kind='stable')
+    df = _dedupe(df, manifest).drop(columns=[SEQ_COL])
+    return df.sort_values(manifest['time_col'], kind='stable').reset_index(drop=True), manifest['seq']
+
+def clear(key=None):
+    with _lock:
+        target = _key_dir(key) if key is not None else STORE_DIR
+        shutil.rmtree(target, ignore_errors=True)
@@ -0,0 +1,114 @@
+import io
+import os
+import threading
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from python_scripts import http_client
+
+load_dotenv()
+
+# Dashboard-side copy of the collector's datasets, kept current through the
+# collector's /sync?key=<key>&since=<seq> endpoint. Only rows written since
+# the last seq we saw are transferred and merged in memory. When the dataset's
+# epoch changes (it was cleared or rebuilt) the copy is fetched again in full.
+
+COLLECTOR_URL = os.getenv('COLLECTOR_URL')
+
+_datasets = {}
+_lock = threading.Lock()
+
+def _fetch_delta(key, since):
+    response = http_client.get(f'{COLLECTOR_URL}/sync', params={"key": key, "since": since})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+    keep_subset = response.headers.get('X-Keep-Subset', '')
+    return {
+        "epoch": response.headers.get('X-Dataset-Epoch', ''),
+        "seq": int(response.headers['X-Dataset-Seq']),
+        "time_col": response.headers['X-Time-Col'],
+        "keep_subset": [col for col in keep_subset.split(',') if col],
+        "rows": pd.read_parquet(io.BytesIO(response.content))
+    }
+
+def sync(key):
+    """Pull and apply rows written since our last seq; returns the dataset's seq"""
+    with _lock:
+        local = _datasets.get(key)
+        since = local['seq'] if local else 0
+
+        delta = _fetch_delta(key, since)
+        if delta is None:
+            _datasets.pop(key, None)
+            return 0
+
+        # The dataset was recreated since our last sync (cleared, rebuilt);
+        # our seqs mean nothing in the new epoch, so start over from a full copy
+        if local is not None and (delta['epoch'] != local['epoch'] or delta['seq'] < local['seq']):
+            local = None
+            delta = _fetch_delta(key, 0)
+
+        if local is None:
+            df = delta['rows']
+        elif delta['rows'].empty:
+            df = local['df']
+        else:
+            keep_cols = [delta['time_col']] + delta['keep_subset']
+            df = pd.concat([local['df'], delta['rows']], ignore_index=True)
+            df = df.drop_duplicates(subset=keep_cols, keep='last')
+            df = df.sort_values(delta['time_col'], kind='stable').reset_index(drop=True)
+
+        _datasets[key] = {
+            "epoch": delta['epoch'],
+            "seq": delta['seq'],
+            "time_col": delta['time_col'],
+            "keep_subset": delta['keep_subset'],
+            "df": df
+        }
+        return delta['seq']
+
+def _as_naive(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+def _local(key):
+    if key not in _datasets:
+        sync(key)
+    return _datasets.get(key)
+
+def version(key):
+    return sync(key)
+
+def version_key(key):
+    """Epoch and seq, as store.version_key"""
+    seq = sync(key)
+    local = _datasets.get(key)
+    return f"{local['epoch'] if local else ''}:{seq}"
+
+def read(key, start=None, end=None, columns=None):
+    local = _local(key)
+    if local is None:
+        return pd.DataFrame()
+
+    df = local['df']
+    time_col = local['time_col']
+    if start is not None:
+        df = df[df[time_col] >= _as_naive(start)]
+    if end is not None:
+        df = df[df[time_col] <= _as_naive(end)]
+    if columns is not None:
+        keep_cols = [time_col] + local['keep_subset']
+        df = df[keep_cols + [col for col in columns if col not in keep_cols]]
+    return df.reset_index(drop=True)
+
+def tail(key, columns=None):
+    """Rows from the latest day, mirroring store.tail on a daily partition"""
+    local = _local(key)
+    if local is None or local['df'].empty:
+        return pd.DataFrame()
+
+    last_day = local['df'][local['time_col']].max().floor('D')
+    return read(key, start=last_day, columns=columns)
@@ -1,43 +1,73 @@
 import json
-import requests
 import time
 import pandas as pd
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from dune_client.client import DuneClient
 
+from python_scripts import http_client
+
 load_dotenv()
 
 DUNE_KEY = os.getenv('DUNE_API_KEY')
+PAGINATION_WINDOW = int(os.getenv('PAGINATION_WINDOW', 8))
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', 8))
 
-dune = DuneClient(DUNE_KEY)
+FLIPSIDE_URL = "https://api-v2.flipsidecrypto.xyz/json-rpc"
+FLIPSIDE_PAGE_SIZE = 10000
 
-def flipside_api_results(query, api_key, attempts=10, delay=30):
+dune = DuneClient(DUNE_KEY)
 
-    url = "https://api-v2.flipsidecrypto.xyz/json-rpc"
+def _flipside_rpc(method, params, api_key, retry=False):
     headers = {
         "Content-Type": "application/json",
         "x-api-key": api_key
     }
-
-    # Step 1: Create the query
     payload = {
         "jsonrpc": "2.0",
-        "method": "createQueryRun",
-        "params": [
-            {
-                "resultTTLHours": 1,
-                "maxAgeMinutes": 0,
-                "sql": query,
-                "tags": {"source": "python-script", "env": "production"},
-                "dataSource": "snowflake-default",
-                "dataProvider": "flipside"
-            }
-        ],
+        "method": method,
+        "params": [params],
         "id": 1
     }
+    return http_client.post(FLIPSIDE_URL, headers=headers, json=payload, retry_post=retry)
+
+def _flipside_results_page(query_run_id, page_number, api_key, page_size=FLIPSIDE_PAGE_SIZE):
+    response = _flipside_rpc("getQueryRunResults", {
+        "queryRunId": query_run_id,
+        "format": "json",
+        "page": {"number": page_number, "size": page_size}
+    }, api_key, retry=True)
+
+    if response.status_code != 200:
+        print(f"Polling error. Status: {response.status_code}, Response: {response.text}")
+        return None
+
+    try:
+        return response.json()
+    except json.JSONDecodeError as e:
+        print(f"Error decoding polling response: {e}. Response text: {response.text}")
+        return None
+
+def flipside_api_results(query, api_key, attempts=10, delay=30, min_delay=0.5, backoff=1.5,
+                         page_size=FLIPSIDE_PAGE_SIZE, max_workers=FETCH_CONCURRENCY):
+    """
+    Run a Flipside query and return all result rows as a DataFrame.
 
-    response = requests.post(url, headers=headers, json=payload)
+    Polling starts at `min_delay` seconds and grows by `backoff` up to `delay`,
+    within an overall budget of `attempts * delay` seconds. Page 1 of the
+    finished run is kept and the remaining pages are fetched concurrently.
+    """
+
+    # Step 1: Create the query
+    response = _flipside_rpc("createQueryRun", {
+        "resultTTLHours": 1,
+        "maxAgeMinutes": 0,
+        "sql": query,
+        "tags": {"source": "python-script", "env": "production"},
+        "dataSource": "snowflake-default",
+        "dataProvider": "flipside"
+    }, api_key)
 
     if response.status_code != 200:
         print(f"Query creation failed. Status: {response.status_code}, Response: {response.text}")
@@ -54,62 +84,55 @@ def flipside_api_results(query, api_key, attempts=10, delay=30):
         print(f"Query creation response: {response_data}")
         raise KeyError("Failed to retrieve query run ID.")
 
-    # Step 2: Poll for query completion
-    for attempt in range(attempts):
-        status_payload = {
-            "jsonrpc": "2.0",
-            "method": "getQueryRunResults",
-            "params": [
-                {
-                    "queryRunId": query_run_id,
-                    "format": "json",
-                    "page": {"number": 1, "size": 10000}
-                }
-            ],
-            "id": 1
-        }
-
-        response = requests.post(url, headers=headers, json=status_payload)
-        if response.status_code != 200:
-            print(f"Polling error. Status: {response.status_code}, Response: {response.text}")
-            time.sleep(delay)
-            continue
-
-        try:
-            resp_json = response.json()
-        except json.JSONDecodeError as e:
-            print(f"Error decoding polling response: {e}. Response text: {response.text}")
-            time.sleep(delay)
-            continue
-
-        if 'result' in resp_json and 'rows' in resp_json['result']:
-            all_rows = []
-            page_number = 1
-
-            while True:
-                status_payload["params"][0]["page"]["number"] = page_number
-                response = requests.post(url, headers=headers, json=status_payload)
-                resp_json = response.json()
-
-                if 'result' in resp_json and 'rows' in resp_json['result']:
-                    rows = resp_json['result']['rows']
-                    if not rows:
-                        break  # No more rows to fetch
-                    all_rows.extend(rows)
-                    page_number += 1
-                else:
-                    break
-
-            return pd.DataFrame(all_rows)
-
-        if 'error' in resp_json and 'not yet completed' in resp_json['error'].get('message', '').lower():
-            print(f"Query not completed. Retrying in {delay} seconds...")
-            time.sleep(delay)
-        else:
+    # Step 2: Poll for query completion with adaptive backoff
+    deadline = time.monotonic() + attempts * delay
+    wait = min_delay
+
+    while True:
+        resp_json = _flipside_results_page(query_run_id, 1, api_key, page_size)
+
+        if resp_json is not None and 'result' in resp_json and 'rows' in resp_json['result']:
+            break
+
+        if resp_json is not None and not (
+            'error' in resp_json and 'not yet completed' in resp_json['error'].get('message', '').lower()
+        ):
             print(f"Unexpected polling error: {resp_json}")
             raise Exception(f"Polling error: {resp_json}")
 
-    raise TimeoutError(f"Query did not complete after {attempts} attempts.")
+        if time.monotonic() + wait > deadline:
+            raise TimeoutError(f"Query did not complete within {attempts * delay} seconds.")
+
+        print(f"Query not completed. Retrying in {wait:.1f} seconds...")
+        time.sleep(wait)
+        wait = min(wait * backoff, delay)
+
+    # Step 3: Reuse page 1 and fetch the rest concurrently
+    all_rows = list(resp_json['result']['rows'] or [])
+    total_pages = (resp_json['result'].get('page') or {}).get('totalPages')
+
+    if total_pages is not None:
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                pages = executor.map(
+                    lambda number: _flipside_results_page(query_run_id, number, api_key, page_size),
+                    range(2, total_pages + 1)
+                )
+                for page in pages:
+                    if page is None or 'result' not in page:
+                        raise Exception(f"Failed to fetch results page for {query_run_id}")
+                    all_rows.extend(page['result']['rows'] or [])
+    elif all_rows:
+        # No page metadata; walk the remaining pages until one comes back empty
+        page_number = 2
+        while True:
+            page = _flipside_results_page(query_run_id, page_number, api_key, page_size)
+            if page is None or 'result' not in page or not page['result'].get('rows'):
+                break
+            all_rows.extend(page['result']['rows'])
+            page_number += 1
+
+    return pd.DataFrame(all_rows)
 
 def prepare_data_for_simulation(price_timeseries, start_date, end_date):
     """
@@ -142,47 +165,66 @@ def dune_api_results(query_num, save_csv=False, csv_path=None):
     return df
 
 def call_api(base_url, params=None):
-    response = requests.get(base_url, params=params)
+    response = http_client.get(base_url, params=params)
 
     # Check if the request was successful
     if response.status_code == 200:
-        data = response.json()
-        print("data:", data)
-        return data
+        return response.json()
     else:
         print("Error:", response.status_code, response.text)
         return None
 
-def get_pagination_results(base_url):
-    # Pagination parameters
-    limit = 100  # Number of records per request
-    offset = 0  # Start from the first record
+def _fetch_page(base_url, offset, limit):
+    url = f"{base_url}?offset={offset}&limit={limit}"
+    response = http_client.get(url)
+    if response.status_code != 200:
+        print(f"Error: {response.status_code} - {response.text}")
+        return None
+    return response.json()
+
+def get_pagination_results(base_url, limit=100, window=PAGINATION_WINDOW):
+    """
+    Walk an offset/limit endpoint keeping `window` page requests in flight.
+
+    Pages are consumed in order and the walk stops at the first empty (or
+    failed) page; requests already issued past that point are discarded.
+    """
     all_results = []  # Store all retrieved results
+    next_page = 0
+    in_flight = {}
 
-    while True:
-        # Construct URL with pagination parameters
-        url = f"{base_url}?offset={offset}&limit={limit}"
-        
-        # Make API request
-        response = requests.get(url)
-        
-        # Check for successful response
-        if response.status_code != 200:
-            print(f"Error: {response.status_code} - {response.text}")
-            break
-        
-        # Parse JSON response
-        data = response.json()
-        
-        # Append results
-        if not data:  # Stop when no more data is returned
-            break
-        
-        all_results.extend(data)
-        
-        # Update offset to fetch the next batch
-        offset += limit
+    executor = ThreadPoolExecutor(max_workers=window)
+
+    def submit(page):
+        in_flight[page] = executor.submit(_fetch_page, base_url, page * limit, limit)
+
+    try:
+        for _ in range(window):
+            submit(next_page)
+            next_page += 1
+
+        page = 0
+        while page in in_flight:
+            data = in_flight.pop(page).result()
+
+            # Stop when no more data is returned
+            if not data:
+                break
+
+            all_results.extend(data)
+            page += 1
+
+            submit(next_page)
+            next_page += 1
+    finally:
+        # Pages requested past the end (or past a failed page) are not needed; don't wait on them
+        executor.shutdown(wait=False, cancel_futures=True)
 
     # Print the total number of results retrieved
     print(f"Total records fetched: {len(all_results)}")
-    return all_results
\ No newline at end of file
+    return all_results
+
+def fetch_all(urls, max_workers=FETCH_CONCURRENCY, params=None):
+    """Call `call_api` for every url with bounded concurrency, preserving order"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda url: call_api(url, params=params), urls))
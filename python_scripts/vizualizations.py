@@ -1,4 +1,10 @@
-def create_charts():
+from chart_builder.scripts.visualization_pipeline import visualization_pipeline
+from chart_builder.scripts.utils import main as chartBuilder
+
+# One function per dashboard figure so each can be rebuilt on its own when
+# its inputs change (see python_scripts.figures)
+
+def supply_by_chain_chart(supply_df):
     fig1 = visualization_pipeline(
         df=supply_df,
             title='rlusd_fig1',
@@ -74,6 +80,9 @@ def create_charts():
         # annotation_text='Staked ETH <br> Withdrawl Activated'
     )
 
+    return fig1
+
+def supply_by_liquidity_chart(supply_comp_df):
     fig3 = visualization_pipeline(
     df=supply_comp_df,
         title='rlusd_fig3',
@@ -148,10 +157,13 @@ def create_charts():
         # annotation_text='Staked ETH <br> Withdrawl Activated'
     )
 
+    return fig3
+
+def lp_by_chain_chart(combined_rlusd_lp, start_date):
     fig4 = visualization_pipeline(
-    df=combined_rlusd_lp[combined_rlusd_lp.index >= rlusd_xrp_df.index.min()],
+    df=combined_rlusd_lp[combined_rlusd_lp.index >= start_date],
         title='rlusd_fig4',
-        start_date=str(rlusd_xrp_df.index.min()),
+        start_date=str(start_date),
         # end_date='2024-12-31',
         # end_date='2024-10-01',
         chart_type='line',
@@ -228,6 +240,9 @@ def create_charts():
         # annotation_text='Staked ETH <br> Withdrawl Activated'
     )
 
+    return fig4
+
+def volume_by_chain_pie(vol_by_chain):
     fig7 = visualization_pipeline(
     df=vol_by_chain,
         title='rlusd_fig7',
@@ -301,14 +316,13 @@ def create_charts():
         # annotation_text='Staked ETH <br> Withdrawl Activated'
     )
 
-    print(f'formatted_today_utc: {formatted_today_utc}')
-    print(f'combined_vol.index: {combined_vol.index}')
-    # combined_vol[combined_vol.index < formatted_today_utc]
+    return fig7
 
+def volume_by_chain_bar(combined_vol, start_date):
     fig6 = visualization_pipeline(
     df=combined_vol[combined_vol.index < combined_vol.index.max()],
         title='rlusd_fig6',
-        start_date=str(rlusd_xrp_df.index.min()),
+        start_date=str(start_date),
         # end_date='2024-12-31',
         # end_date='2024-10-01',
         chart_type='bar',
@@ -381,81 +395,14 @@ def create_charts():
         # date='2023-04-12',
         # annotation_text='Staked ETH <br> Withdrawl Activated'
     )
-    fig8 = visualization_pipeline(
-    df=combined_vol[combined_vol.index < combined_vol.index.max()],
-        title='rlusd_fig8',
-        start_date=str(rlusd_xrp_df.index.min()),
-        # end_date='2024-12-31',
-        # end_date='2024-10-01',
-        chart_type='bar',
-        dimensions=dict(height=351, width=730),
-        groupby = 'blockchain',
-        num_col='volume',
-        # cols_to_plot=["RLUSD_ETH_LP","RLUSD_XRP_LP"],
-        # line_col=['cumulative_freq'],
-        # bar_col=['freg'],
-        tickangle=0,
-        dropna=True,
-        area=True,
-        # colors=combined_colors,
-        # axes_data=dict(y1=['total_tvl'],y2=[]),
-        # tickformat=dict(x='%b<br>`%y',y1=None,y2=None),
-        legend_font_size=12,
-        # font_family=font_family,
-        legend_placement=dict(x=0.8,y=0.9),
-        cumulative_sort=True,
-        normalize=False,
-        decimals=True,
-        decimal_places=1,
-        y2=True,
-        min_tick_spacing=50,
-        # buffer=3,
-        # barmode='group',
-        mode='lines',
-        # font_size=14,
-        # line_width=3,
-        marker_size=3,
-        margin=dict(l=0, r=0, t=50, b=0),
-        tickprefix=dict(y1='$',y2=None),
-        ticksuffix=dict(y1=None,y2=None),
-        axes_titles=dict(y1=None,y2=None),
-        show_legend=True,
-        hole_size=0,
-        # line_width=1,
-        descending=True,
-        buffer = 3,
-        annotations=False,
-        text=False,
-        orientation='h',
-        sort_list=True,
-        autosize=False,
-        max_annotation=False,
-        annotation_prefix="$",
-        auto_title=False,
-        axes_font_colors='auto',
-        to_reverse=False,
-        line_color='black',
-        use_single_color=False,
-        custom_annotation = ['2022-10-31'],
-        # axes_font_colors='auto',
-    )
 
-    chartBuilder(
-        fig=fig8,
-        add_the_date=True,
-        clean_columns=False,
-        date_xy=dict(x=0.87,y=.98),
-        title_xy=dict(x=0.1,y=0.9),
-        keep_top_n=False,
-        # groupby=True,
-        other=True,
-        title='RLUSD DEX Volume By Chain',
-        save=False,
-        show=False,
-        topn=4,
-        # dashed_line=True,
-        # date='2023-04-12',
-        # annotation_text='Staked ETH <br> Withdrawl Activated'
-    )
+    return fig6
+
+def create_charts(supply_df, supply_comp_df, combined_rlusd_lp, combined_vol, vol_by_chain, start_date):
+    fig1 = supply_by_chain_chart(supply_df)
+    fig3 = supply_by_liquidity_chart(supply_comp_df)
+    fig4 = lp_by_chain_chart(combined_rlusd_lp, start_date)
+    fig7 = volume_by_chain_pie(vol_by_chain)
+    fig6 = volume_by_chain_bar(combined_vol, start_date)
 
-    return fig1, fig3, fig4, fig6, fig7 
\ No newline at end of file
+    return fig1, fig3, fig4, fig6, fig7
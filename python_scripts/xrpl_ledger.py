@@ -0,0 +1,265 @@
+import os
+import time
+import asyncio
+import threading
+
+import pandas as pd
+from dotenv import load_dotenv
+from xrpl.clients import WebsocketClient
+from xrpl.asyncio.clients import AsyncWebsocketClient
+from xrpl.models.requests import (Subscribe, StreamParameter, GatewayBalances, AccountInfo, AccountLines,
+                                  Ledger, GenericRequest)
+from xrpl.utils import get_balance_changes, ripple_time_to_datetime
+
+from python_scripts import store
+
+load_dotenv()
+
+# Ledger-native XRPL collector.
+#
+# Keeps one websocket open to an XRPL node, subscribed to the RLUSD issuer and
+# the tracked AMM accounts. On (re)connect the balances are snapshotted from
+# the validated ledger; after that every validated transaction touching those
+# accounts is applied from its metadata, so the state moves ledger by ledger
+# without polling. A row per pool and a supply row are written to the store at
+# most once every XRPL_SNAPSHOT_INTERVAL seconds of ledger time.
+
+XRPL_WS_URL = os.getenv('XRPL_WS_URL', 'wss://s1.ripple.com')
+RLUSD_XRP_ADDRESS = os.getenv('RLUSD_XRP_ADDRESS')
+RLUSD_CURRENCY_HEX = "524C555344000000000000000000000000000000"
+XRPL_RLUSD_POOLS = [
+    pool.strip() for pool in os.getenv('XRPL_RLUSD_POOLS', 'rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3').split(',')
+    if pool.strip()
+]
+XRPL_SNAPSHOT_INTERVAL = int(os.getenv('XRPL_SNAPSHOT_INTERVAL', 300))
+XRPL_RECONNECT_MAX = float(os.getenv('XRPL_RECONNECT_MAX', 60))
+# Ledgers close every few seconds, so a silent socket this long is dead
+XRPL_STREAM_TIMEOUT = float(os.getenv('XRPL_STREAM_TIMEOUT', 30))
+XRP_DROPS = 1e6
+
+POOLS_KEY = 'xrpl_amm_ledger'
+SUPPLY_KEY = 'xrpl_supply_ledger'
+
+_state = {
+    "ledger_index": None,
+    "ledger_time": None,
+    "supply": None,
+    "pools": {},
+    "last_snapshot": None,
+}
+_lock = threading.Lock()
+
+def _is_rlusd(balance, issuer):
+    return balance['currency'] == RLUSD_CURRENCY_HEX and balance.get('issuer') == issuer
+
+def load_state(client, issuer=None, pools=None):
+    """Snapshot issuer obligations and pool balances from the validated ledger"""
+    issuer = issuer or RLUSD_XRP_ADDRESS
+    pools = pools if pools is not None else XRPL_RLUSD_POOLS
+
+    gateway = client.request(GatewayBalances(account=issuer, ledger_index='validated')).result
+    ledger_index = gateway['ledger_index']
+    obligations = gateway.get('obligations', {})
+    supply = float(obligations.get(RLUSD_CURRENCY_HEX, obligations.get('RLUSD', 0)))
+
+    balances = {}
+    for pool in pools:
+        info = client.request(AccountInfo(account=pool, ledger_index=ledger_index)).result
+        lines = client.request(AccountLines(account=pool, peer=issuer, ledger_index=ledger_index)).result
+        rlusd_bal = sum(
+            float(line['balance']) for line in lines.get('lines', [])
+            if line['currency'] == RLUSD_CURRENCY_HEX
+        )
+        balances[pool] = {
+            "xrp_bal": float(info['account_data']['Balance']) / XRP_DROPS,
+            "rlusd_bal": rlusd_bal
+        }
+
+    return ledger_index, supply, balances
+
+def _amm_side(amount, issuer):
+    # amm_info amounts are drops for XRP and {currency, issuer, value} for tokens
+    if isinstance(amount, str):
+        return 'xrp_bal', float(amount) / XRP_DROPS
+    if _is_rlusd(amount, issuer):
+        return 'rlusd_bal', float(amount['value'])
+    return None, None
+
+async def _fetch_amm_batch(url, pools, issuer, ledger_index):
+    async with AsyncWebsocketClient(url) as client:
+        if ledger_index is None:
+            ledger = await client.request(Ledger(ledger_index='validated'))
+            ledger_index = ledger.result['ledger_index']
+
+        # The AMMInfo model has no ledger_index, so amm_info goes out as a
+        # GenericRequest with its own id (the client would otherwise rebuild it
+        # as AMMInfo when assigning one)
+        requests = [
+            GenericRequest(method='amm_info', id=f'amm_info_{i}', amm_account=pool, ledger_index=ledger_index)
+            for i, pool in enumerate(pools)
+        ]
+        requests.append(GatewayBalances(account=issuer, ledger_index=ledger_index))
+
+        # Sent back to back on the one socket; responses are matched by id
+        responses = await asyncio.gather(*(client.request(request) for request in requests))
+    return ledger_index, responses
+
+def amm_snapshot(pools=None, issuer=None, ledger_index=None, url=XRPL_WS_URL):
+    """
+    amm_info for every pool and gateway_balances for the issuer in one batch.
+
+    All requests are pipelined over a single websocket and pinned to the same
+    validated ledger (the latest one unless ledger_index is given), so pool
+    balances and supply are consistent with each other. Returns
+    (ledger_index, pools DataFrame, supply); pools that fail to resolve are
+    left out.
+    """
+
+    issuer = issuer or RLUSD_XRP_ADDRESS
+    pools = pools if pools is not None else XRPL_RLUSD_POOLS
+
+    ledger_index, responses = asyncio.run(_fetch_amm_batch(url, pools, issuer, ledger_index))
+    *amm_responses, gateway = responses
+
+    rows = []
+    for pool, response in zip(pools, amm_responses):
+        if not response.is_successful():
+            print(f"amm_info failed for {pool}: {response.result.get('error')}")
+            continue
+        amm = response.result['amm']
+        row = {"pool": pool, "ledger_index": ledger_index, "xrp_bal": None, "rlusd_bal": None,
+               "lp_tokens": float(amm['lp_token']['value']), "trading_fee": amm.get('trading_fee')}
+        for side in ('amount', 'amount2'):
+            column, value = _amm_side(amm[side], issuer)
+            if column is not None:
+                row[column] = value
+        rows.append(row)
+
+    supply = None
+    if gateway.is_successful():
+        obligations = gateway.result.get('obligations', {})
+        supply = float(obligations.get(RLUSD_CURRENCY_HEX, obligations.get('RLUSD', 0)))
+    else:
+        print(f"gateway_balances failed: {gateway.result.get('error')}")
+
+    return ledger_index, pd.DataFrame(rows), supply
+
+def apply_transaction(state, meta, issuer):
+    """Apply one validated transaction's balance changes to the in-memory state"""
+    for change in get_balance_changes(meta):
+        account = change['account']
+        if account == issuer:
+            # Issuer trust lines go up as RLUSD is redeemed and down as it is issued
+            issued = sum(float(b['value']) for b in change['balances'] if b['currency'] == RLUSD_CURRENCY_HEX)
+            if issued and state['supply'] is not None:
+                state['supply'] -= issued
+        elif account in state['pools']:
+            pool = state['pools'][account]
+            for balance in change['balances']:
+                if balance['currency'] == 'XRP':
+                    pool['xrp_bal'] += float(balance['value'])
+                elif _is_rlusd(balance, issuer):
+                    pool['rlusd_bal'] += float(balance['value'])
+
+def snapshot_frames(state):
+    ledger_time = pd.Timestamp(state['ledger_time']).tz_convert(None)
+    pools = pd.DataFrame([
+        {"dt": ledger_time, "ledger_index": state['ledger_index'], "pool": pool, **balances}
+        for pool, balances in state['pools'].items()
+    ])
+    supply = pd.DataFrame([{
+        "dt": ledger_time,
+        "ledger_index": state['ledger_index'],
+        "RLUSD_XRPL_Supply": state['supply']
+    }])
+    return pools, supply
+
+def write_snapshot(state):
+    pools, supply = snapshot_frames(state)
+    if not pools.empty:
+        store.append(POOLS_KEY, pools, time_col='dt', keep_subset=['pool'])
+    store.append(SUPPLY_KEY, supply, time_col='dt')
+    state['last_snapshot'] = state['ledger_time']
+    print(f"xrpl snapshot at ledger {state['ledger_index']}")
+
+def on_ledger_closed(state, message):
+    state['ledger_index'] = message['ledger_index']
+    state['ledger_time'] = ripple_time_to_datetime(message['ledger_time'])
+
+    last = state['last_snapshot']
+    if last is None or (state['ledger_time'] - last).total_seconds() >= XRPL_SNAPSHOT_INTERVAL:
+        write_snapshot(state)
+
+def current_state():
+    with _lock:
+        return {
+            "ledger_index": _state['ledger_index'],
+            "ledger_time": _state['ledger_time'],
+            "supply": _state['supply'],
+            "pools": {pool: dict(balances) for pool, balances in _state['pools'].items()}
+        }
+
+def stream(url=XRPL_WS_URL, issuer=None, pools=None, should_run=None):
+    """
+    Follow the ledger on one connection until it drops, or until should_run()
+    returns False at a ledger close.
+    """
+    issuer = issuer or RLUSD_XRP_ADDRESS
+    pools = pools if pools is not None else XRPL_RLUSD_POOLS
+
+    with WebsocketClient(url, timeout=XRPL_STREAM_TIMEOUT) as client:
+        # Subscribe first so no ledger falls between the snapshot and the stream
+        client.send(Subscribe(streams=[StreamParameter.LEDGER], accounts=[issuer] + list(pools)))
+        ledger_index, supply, balances = load_state(client, issuer, pools)
+        with _lock:
+            _state.update({"ledger_index": ledger_index, "supply": supply, "pools": balances})
+        print(f'xrpl stream following {len(pools)} pools from ledger {ledger_index}')
+
+        for message in client:
+            kind = message.get('type')
+            if kind == 'transaction':
+                if not message.get('validated') or message.get('ledger_index', 0) <= ledger_index:
+                    continue
+                with _lock:
+                    apply_transaction(_state, message['meta'], issuer)
+            elif kind == 'ledgerClosed':
+                if message['ledger_index'] <= ledger_index:
+                    continue
+                with _lock:
+                    on_ledger_closed(_state, message)
+                if should_run is not None and not should_run():
+                    print('xrpl stream stopping: no longer the leader')
+                    return
+        print('xrpl stream closed or went quiet')
+
+def run(url=XRPL_WS_URL, issuer=None, pools=None, should_run=None):
+    """
+    Keep the stream alive, resnapshotting after every reconnect.
+
+    should_run lets several processes share one stream: only the one for
+    which it returns True connects, the others wait and check again.
+    """
+    delay = 1
+    while True:
+        if should_run is not None and not should_run():
+            time.sleep(XRPL_RECONNECT_MAX)
+            continue
+
+        started = time.monotonic()
+        try:
+            stream(url, issuer, pools, should_run)
+        except Exception as e:
+            print(f'xrpl stream dropped: {e}')
+        if time.monotonic() - started > XRPL_RECONNECT_MAX:
+            delay = 1
+        print(f'reconnecting to {url} in {delay}s')
+        time.sleep(delay)
+        delay = min(delay * 2, XRPL_RECONNECT_MAX)
+
+def start_background(url=XRPL_WS_URL, issuer=None, pools=None, should_run=None):
+    thread = threading.Thread(target=run, args=(url, issuer, pools, should_run), daemon=True, name='xrpl-ledger')
+    thread.start()
+    return thread
+
+if __name__ == '__main__':
+    run()
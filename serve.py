@@ -0,0 +1,17 @@
+import os
+
+from python_scripts import artifacts
+from python_scripts.dashboard import create_app
+
+# Serving-only entry point: Dash plus the figure artifacts persisted under
+# data/figures. No collectors, chart builders or scheduler are imported;
+# figures built by app.py (or any other builder sharing ARTIFACTS_DIR) are
+# picked up as their manifest changes.
+
+print(f"Loaded persisted figures: {artifacts.load()}")
+
+app = create_app(reload_from_disk=True)
+server = app.server
+
+if __name__ == '__main__':
+    app.run(port=int(os.getenv('PORT', 8050)), debug=False)
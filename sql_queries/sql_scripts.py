@@ -148,4 +148,258 @@ order by
   a.dt desc
 
 """
-    return query
\ No newline at end of file
+    return query
+
+def lp_data_batch(addresses,start_date='2024-12-17 00:00:00',watermarks=None,seed_balances=None):
+    # Same hourly LP balance/TVL series as lp_data, for many pools in a single
+    # query partitioned by pool. watermarks ({address: hour}) and seed_balances
+    # ({address: {symbol: bal}}) make each pool incremental independently;
+    # pools without a watermark are returned from start_date. Every pool gets
+    # its own hour series and scan window, so a new pool doesn't drag the
+    # others back to start_date.
+    watermarks = watermarks or {}
+    seed_balances = seed_balances or {}
+
+    pool_rows = []
+    seed_rows = []
+    for address in addresses:
+        watermark = watermarks.get(address)
+        series_start = watermark if watermark is not None else start_date
+        needs_seed = watermark is not None and not seed_balances.get(address)
+        watermark_sql = f"'{watermark}'" if watermark is not None else 'NULL'
+        pool_rows.append(
+            f"(lower('{address}'), '{series_start}', {watermark_sql}, {str(needs_seed).upper()})"
+        )
+        if watermark is not None:
+            for symbol, bal in (seed_balances.get(address) or {}).items():
+                seed_rows.append(f"(lower('{address}'), '{watermark}', '{symbol}', {float(bal)})")
+
+    pool_values = ',\n    '.join(pool_rows)
+
+    seed_values = ''
+    if seed_rows:
+        seed_values = """
+  SELECT
+    column1 AS pool,
+    column2::TIMESTAMP AS dt,
+    column3 AS symbol,
+    column4::FLOAT AS current_bal
+  FROM
+    VALUES
+    {rows}
+  UNION ALL""".format(rows=',\n    '.join(seed_rows))
+
+    query = f"""
+
+  WITH RECURSIVE pools AS (
+  SELECT
+    column1 AS pool,
+    column2::TIMESTAMP AS series_start,
+    column3::TIMESTAMP AS watermark,
+    column4 AS needs_seed
+  FROM
+    VALUES
+    {pool_values}
+),
+
+date_series AS (
+  SELECT
+    pool,
+    series_start AS DT
+  FROM
+    pools
+  UNION
+  ALL
+  SELECT
+    pool,
+    DT + INTERVAL '1 HOUR'
+  FROM
+    date_series
+  WHERE
+    DT + INTERVAL '1 HOUR' <= CURRENT_TIMESTAMP
+),
+
+main_tokens as (
+  SELECT
+    user_address AS pool,
+    symbol,
+    CONTRACT_ADDRESS,
+    USD_VALUE_NOW
+  FROM
+    ethereum.core.ez_current_balances
+  WHERE
+    user_address in (select pool from pools)
+  AND USD_VALUE_NOW IS NOT NULL
+  QUALIFY ROW_NUMBER() OVER (
+      PARTITION BY user_address
+      ORDER BY
+        USD_VALUE_NOW DESC
+    ) <= 2
+),
+
+date_series_symbol AS (
+  SELECT
+    d.DT,
+    t.pool,
+    t.symbol,
+    t.contract_address
+  FROM
+    date_series d
+    JOIN main_tokens t ON t.pool = d.pool
+),
+
+seed AS ({seed_values}
+  SELECT
+    b.user_address AS pool,
+    p.watermark AS dt,
+    b.symbol,
+    b.current_bal
+  FROM
+    ethereum.core.ez_balance_deltas b
+    JOIN pools p ON p.pool = b.user_address
+    JOIN main_tokens t ON t.pool = b.user_address
+    AND t.contract_address = b.contract_address
+  WHERE
+    b.user_address in (select pool from pools where needs_seed)
+    AND b.block_timestamp < p.watermark + INTERVAL '1 HOUR'
+  QUALIFY ROW_NUMBER() OVER (
+      PARTITION BY b.user_address, b.symbol
+      ORDER BY
+        b.block_timestamp DESC
+    ) = 1
+),
+
+hourly_lp AS (
+  SELECT
+    b.user_address AS pool,
+    date_trunc('hour', b.block_timestamp) AS dt,
+    b.symbol,
+    AVG(b.current_bal) AS current_bal
+  FROM
+    ethereum.core.ez_balance_deltas b
+    JOIN pools p ON p.pool = b.user_address
+    JOIN main_tokens t ON t.pool = b.user_address
+    AND t.contract_address = b.contract_address
+  WHERE
+    b.user_address in (select pool from pools)
+    AND b.block_timestamp >= p.series_start
+    AND (p.watermark IS NULL OR b.block_timestamp >= p.watermark + INTERVAL '1 HOUR')
+  GROUP BY
+    b.user_address,
+    date_trunc('hour', b.block_timestamp),
+    b.symbol
+  UNION ALL
+  SELECT
+    pool,
+    dt,
+    symbol,
+    current_bal
+  FROM
+    seed
+),
+joined_data AS (
+  SELECT
+    dss.DT,
+    dss.pool,
+    dss.symbol,
+    dss.contract_address,
+    hlp.current_bal
+  FROM
+    date_series_symbol dss
+    LEFT JOIN hourly_lp hlp ON dss.DT = hlp.dt
+    AND dss.pool = hlp.pool
+    AND dss.symbol = hlp.symbol
+),
+front_filled_data AS (
+  SELECT
+    DT,
+    pool,
+    symbol,
+    contract_address,
+    LAST_VALUE(current_bal IGNORE NULLS) OVER (
+      PARTITION BY pool, symbol
+      ORDER BY
+        DT ROWS BETWEEN UNBOUNDED PRECEDING
+        AND CURRENT ROW
+    ) AS current_bal
+  FROM
+    joined_data
+),
+token_starts as (
+  SELECT
+    t.contract_address,
+    MIN(p.series_start) AS series_start
+  FROM
+    main_tokens t
+    JOIN pools p ON p.pool = t.pool
+  GROUP BY
+    t.contract_address
+),
+prices as (
+  select
+    pr.hour,
+    pr.token_address,
+    pr.price
+  from
+    ethereum.price.ez_prices_hourly pr
+    join token_starts ts on ts.contract_address = pr.token_address
+  where
+    pr.hour >= ts.series_start
+    and pr.hour <= date_trunc('hour',current_timestamp)
+),
+tvl_per_token as (
+  SELECT
+    ff.DT,
+    ff.pool,
+    ff.symbol,
+    ff.current_bal,
+    p.price,
+    ff.current_bal * p.price as TVL
+  FROM
+    front_filled_data ff
+    join prices p on p.hour = ff.DT
+    and p.token_address = ff.contract_address
+)
+select
+  a.pool,
+  a.dt,
+  a.symbol,
+  a.current_bal,
+  a.TVL,
+  sum(a.TVL) over (
+    partition by a.pool, a.dt
+  ) as Total_TVL
+from
+  tvl_per_token a
+  join pools p on p.pool = a.pool
+where
+  p.watermark IS NULL OR a.dt > p.watermark
+order by
+  a.pool,
+  a.dt desc
+
+"""
+    return query
+
+def rlusd_pools_query(token_address,min_usd=10000):
+    # Ethereum DEX pools that list RLUSD and currently hold at least min_usd of it
+    if not token_address:
+        raise ValueError('RLUSD_ETHEREUM_ADDRESS is not set')
+    query = f"""
+
+select
+  p.pool_address,
+  p.platform,
+  b.usd_value_now
+from
+  ethereum.defi.dim_dex_liquidity_pools p
+  join ethereum.core.ez_current_balances b on b.user_address = p.pool_address
+  and b.contract_address = lower('{token_address}')
+where
+  contains(lower(p.tokens::string), lower('{token_address}'))
+  and b.usd_value_now >= {min_usd}
+order by
+  b.usd_value_now desc
+
+"""
+    return query
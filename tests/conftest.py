@@ -0,0 +1,21 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Modules read ABIs and SQL relative to the repo root and some read their
+# configuration at import time, so both are set before any test imports them
+sys.path.insert(0, str(BASE_DIR))
+os.chdir(BASE_DIR)
+os.environ.setdefault('DUNE_API_KEY', 'test')
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    """Point the store at an empty directory for one test"""
+    from python_scripts import store
+    path = tmp_path / 'store'
+    monkeypatch.setattr(store, 'STORE_DIR', str(path))
+    return path
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('web3')
+
+from python_scripts import backfill, store
+
+POOL = '0x' + '1' * 40
+OTHER = '0x' + '2' * 40
+THIRD = '0x' + '3' * 40
+
+def transfers(rows):
+    return pd.DataFrame(rows, columns=['dt', 'block', 'log_index', 'from', 'to', 'value'])
+
+def test_fold_balances_without_relevant_transfers():
+    quiet = transfers([(pd.Timestamp('2025-01-01 10:15'), 100, 0, OTHER, THIRD, 5.0)])
+
+    hourly, closing = backfill.fold_balances(quiet, [POOL], opening={POOL: 7.0, backfill.SUPPLY: 50.0},
+                                             start=pd.Timestamp('2025-01-01 09:00'))
+
+    assert hourly.empty
+    assert closing == {POOL: 7.0, backfill.SUPPLY: 50.0}
+
+def test_fold_balances_mints_and_pool_flows():
+    rows = transfers([
+        (pd.Timestamp('2025-01-01 10:15'), 100, 0, backfill.ZERO_ADDRESS, POOL, 10.0),
+        (pd.Timestamp('2025-01-01 12:05'), 110, 0, POOL, OTHER, 4.0),
+    ])
+
+    hourly, closing = backfill.fold_balances(rows, [POOL])
+    balances = hourly.pivot(index='dt', columns='address', values='balance')
+
+    assert list(balances.index) == list(pd.date_range('2025-01-01 10:00', '2025-01-01 12:00', freq='h'))
+    assert balances[POOL].tolist() == [10.0, 10.0, 6.0]
+    assert balances[backfill.SUPPLY].tolist() == [10.0, 10.0, 10.0]
+    assert closing == {POOL: 6.0, backfill.SUPPLY: 10.0}
+
+def _fake_w3():
+    decimals = SimpleNamespace(call=lambda: 18)
+    functions = SimpleNamespace(decimals=lambda: decimals)
+    return SimpleNamespace(eth=SimpleNamespace(contract=lambda **kwargs: SimpleNamespace(functions=functions)))
+
+def test_backfill_moves_past_quiet_windows(store_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(backfill, 'BACKFILL_DIR', str(tmp_path / 'backfill'))
+    # max_workers=1 persists two chunks per window; the second window only
+    # holds a transfer between untracked addresses
+    chunks = {
+        0: transfers([(pd.Timestamp('2025-01-01 10:15'), 5, 0, backfill.ZERO_ADDRESS, POOL, 10.0)]),
+        10: transfers([]),
+        20: transfers([(pd.Timestamp('2025-01-01 11:30'), 25, 0, OTHER, THIRD, 3.0)]),
+    }
+    monkeypatch.setattr(backfill, 'scan_chunk', lambda token, start, end, decimals, w3: chunks[start])
+
+    checkpoint = backfill.backfill(token=OTHER, addresses=[POOL], start_block=0, end_block=29,
+                                   chunk_size=10, max_workers=1, w3=_fake_w3())
+
+    assert checkpoint['next_block'] == 30
+    assert checkpoint['last_hour'] == '2025-01-01T10:00:00'
+    assert checkpoint['balances'] == {POOL: 10.0, backfill.SUPPLY: 10.0}
+    assert backfill.load_checkpoint(OTHER) == checkpoint
+    assert len(store.read(backfill.TRANSFERS_KEY)) == 2
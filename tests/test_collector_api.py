@@ -0,0 +1,74 @@
+import io
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from python_scripts import collector_api, store
+
+@pytest.fixture
+def client(store_dir):
+    rows = pd.DataFrame({
+        "dt": pd.date_range('2025-01-01 22:00', periods=4, freq='h'),
+        "pool": 'a',
+        "balance": [1.0, 2.0, 3.0, 4.0],
+    })
+    store.append('pools', rows, time_col='dt', keep_subset=['pool'])
+
+    app = Flask(__name__)
+    app.register_blueprint(collector_api.blueprint)
+    return app.test_client()
+
+def test_dataset_pages_with_cursor(client):
+    first = client.get('/dataset?key=pools&limit=3')
+    assert first.status_code == 200
+    assert [row['balance'] for row in first.get_json()] == [1.0, 2.0, 3.0]
+
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get(f'/dataset?key=pools&limit=3&cursor={cursor}')
+    assert [row['balance'] for row in second.get_json()] == [4.0]
+    assert 'X-Next-Cursor' not in second.headers
+
+@pytest.mark.parametrize('key', ['../store', '..%2F..%2Fetc', 'pools/2025-01-01', ''])
+def test_dataset_rejects_keys_outside_the_store(client, key):
+    response = client.get(f'/dataset?key={key}')
+    assert response.status_code == 400
+
+def test_dataset_unknown_key(client):
+    assert client.get('/dataset?key=missing').status_code == 404
+
+@pytest.mark.parametrize('query', [
+    'cursor=nonsense',
+    'cursor=2025-01-01:-1',
+    'start=not-a-date',
+    'end=',
+    'columns=balance,missing',
+    'limit=0',
+    'limit=-5',
+    'limit=ten',
+])
+def test_dataset_rejects_bad_params(client, query):
+    response = client.get(f'/dataset?key=pools&{query}')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_dataset_columns_and_range(client):
+    response = client.get('/dataset?key=pools&columns=balance&start=2025-01-02&format=ndjson')
+    rows = pd.read_json(io.StringIO(response.get_data(as_text=True)), lines=True)
+    assert rows['balance'].tolist() == [3.0, 4.0]
+    assert set(rows.columns) == {'dt', 'pool', 'balance'}
+
+def test_dataset_column_added_later(client):
+    store.append('pools', pd.DataFrame({
+        "dt": [pd.Timestamp('2025-01-02 02:00')], "pool": ['a'], "balance": [5.0], "fee": [0.3],
+    }), time_col='dt', keep_subset=['pool'])
+
+    response = client.get('/dataset?key=pools&columns=fee&format=ndjson')
+    assert response.status_code == 200
+    rows = pd.read_json(io.StringIO(response.get_data(as_text=True)), lines=True)
+    assert rows['fee'].tolist()[-1] == pytest.approx(0.3)
+    assert rows['fee'].isna().sum() == 4
+
+def test_store_rejects_path_keys(store_dir):
+    with pytest.raises(ValueError):
+        store.read('../outside')
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('chart_builder')
+
+from python_scripts import data_processing, store
+
+@pytest.fixture
+def supply_store(store_dir):
+    store.append('timeseries', {"hour": '2025-01-02 05:00', "dt": '2025-01-02 05:00', "xrp_bal": 1.0,
+                                "rlusd_bal": 100.0, "RLUSD_XRPL_Supply": 1000.0, "RLUSD_ETH_Supply": 3000.0},
+                 time_col='hour')
+    store.append('eth_lp_hourly_daily', pd.DataFrame({
+        "dt": pd.to_datetime(['2025-01-01']), "symbol": ['RLUSD'], "current_bal": [500.0], "tvl": [500.0]
+    }), time_col='dt', keep_subset=['symbol'])
+
+def test_supply_comp_falls_back_to_daily_lp(supply_store):
+    frame = data_processing.supply_comp_frame()
+    assert frame['Amount'].tolist() == [600.0, 3400.0]
+
+def test_supply_comp_uses_latest_onchain_snapshot(supply_store):
+    store.append('eth_lp_onchain', pd.DataFrame({
+        "hour": ['2025-01-02 04:00', '2025-01-02 04:00', '2025-01-02 05:00', '2025-01-02 05:00'],
+        "pool": ['a', 'b', 'a', 'b'],
+        "rlusd_bal": [1.0, 2.0, 300.0, 400.0],
+        "block": [1, 1, 2, 2],
+    }), time_col='hour', keep_subset=['pool'])
+
+    frame = data_processing.supply_comp_frame()
+    assert frame['Amount'].tolist() == [800.0, 3200.0]
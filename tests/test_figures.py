@@ -0,0 +1,43 @@
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+
+from python_scripts import artifacts, figures, store
+
+@pytest.fixture
+def series_figure(store_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, 'ARTIFACTS_DIR', str(tmp_path / 'figures'))
+    monkeypatch.setattr(artifacts, '_artifacts', {})
+    monkeypatch.setattr(figures, '_cache', {})
+    monkeypatch.setitem(figures.FIGURES, 'series_fig', {
+        "build": lambda: go.Figure(go.Scatter(y=store.read('series')['value'].tolist())),
+        "inputs": ['series'],
+    })
+    return 'series_fig'
+
+def append(values):
+    store.append('series', pd.DataFrame({
+        "dt": pd.date_range('2025-01-01', periods=len(values), freq='h'), "value": values,
+    }))
+
+def plotted(entry):
+    return list(entry['figure']['data'][0]['y'])
+
+def test_recreated_dataset_with_the_same_seq_rebuilds(series_figure, monkeypatch):
+    append([1.0, 2.0])
+    first = figures.get_figure(series_figure)
+    assert plotted(first) == [1.0, 2.0]
+    assert figures.get_figure(series_figure) is first
+
+    # Cleared and rewritten up to the same seq, as after a rollup rebuild
+    store.clear('series')
+    append([7.0, 8.0])
+    assert store.version('series') == 1
+
+    assert plotted(figures.get_figure(series_figure)) == [7.0, 8.0]
+
+    # The same holds for an artifact persisted by an earlier process
+    store.clear('series')
+    append([9.0])
+    monkeypatch.setattr(figures, '_cache', {})
+    assert plotted(figures.get_figure(series_figure)) == [9.0]
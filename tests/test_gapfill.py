@@ -0,0 +1,81 @@
+import pandas as pd
+
+from python_scripts import gapfill, store
+
+def frame(rows):
+    df = pd.DataFrame(rows, columns=['dt', 'key', 'value'])
+    df['dt'] = pd.to_datetime(df['dt'])
+    return df
+
+def records(df):
+    return [(str(row.dt), row.key, row.value) for row in df.sort_values(['key', 'dt']).itertuples()]
+
+def test_fill_carries_stored_values_over_quiet_hours():
+    stored = frame([('2025-01-01 01:00', 'a', 1.0)])
+    new = frame([('2025-01-01 04:00', 'a', 4.0)])
+
+    filled = gapfill.fill(new, stored, 'dt', ['key'], 'h')
+
+    assert records(filled) == [
+        ('2025-01-01 02:00:00', 'a', 1.0),
+        ('2025-01-01 03:00:00', 'a', 1.0),
+        ('2025-01-01 04:00:00', 'a', 4.0),
+    ]
+
+def test_fill_labels_each_bin_with_its_latest_row():
+    stored = frame([('2025-01-01 02:00', 'a', 2.0)])
+    new = frame([
+        ('2025-01-01 03:10', 'a', 3.1),
+        ('2025-01-01 03:50', 'a', 3.5),
+        ('2025-01-01 05:20', 'a', 5.2),
+    ])
+
+    filled = gapfill.fill(new, stored, 'dt', ['key'], 'h')
+
+    assert records(filled) == [
+        ('2025-01-01 03:00:00', 'a', 3.5),
+        ('2025-01-01 04:00:00', 'a', 3.5),
+        ('2025-01-01 05:00:00', 'a', 5.2),
+    ]
+
+def test_fill_starts_a_new_series_off_grid():
+    stored = frame([('2025-01-01 03:00', 'a', 1.0)])
+    new = frame([('2025-01-01 04:30', 'c', 9.0)])
+
+    filled = gapfill.fill(new, stored, 'dt', ['key'], 'h')
+
+    assert records(filled) == [('2025-01-01 04:00:00', 'c', 9.0)]
+
+def test_fill_rewrites_the_bin_of_the_last_stored_row():
+    stored = frame([('2025-01-01 04:00', 'a', 1.0)])
+
+    first = gapfill.fill(frame([('2025-01-01 04:15', 'a', 2.0)]), stored, 'dt', ['key'], 'h')
+    assert records(first) == [('2025-01-01 04:00:00', 'a', 2.0)]
+
+    # A later update in the same hour replaces it again instead of freezing
+    second = gapfill.fill(frame([('2025-01-01 04:45', 'a', 3.0)]), first, 'dt', ['key'], 'h')
+    assert records(second) == [('2025-01-01 04:00:00', 'a', 3.0)]
+
+def test_fill_new_rows_replace_stored_rows():
+    stored = frame([('2025-01-01 01:00', 'a', 1.0), ('2025-01-01 02:00', 'a', 2.0)])
+    new = frame([('2025-01-01 02:00', 'a', 20.0), ('2025-01-01 03:00', 'a', 3.0)])
+
+    filled = gapfill.fill(new, stored, 'dt', ['key'], 'h')
+
+    assert records(filled) == [
+        ('2025-01-01 02:00:00', 'a', 20.0),
+        ('2025-01-01 03:00:00', 'a', 3.0),
+    ]
+
+def test_fill_tail_reads_the_stored_tail(store_dir):
+    store.append('series', frame([('2025-01-01 00:00', 'a', 1.0), ('2025-01-01 01:00', 'b', 5.0)]),
+                 time_col='dt', keep_subset=['key'])
+    new = frame([('2025-01-01 03:20', 'a', 3.0)])
+
+    filled = gapfill.fill_tail('series', new, 'dt', ['key'], 'h')
+
+    assert records(filled) == [
+        ('2025-01-01 01:00:00', 'a', 1.0),
+        ('2025-01-01 02:00:00', 'a', 1.0),
+        ('2025-01-01 03:00:00', 'a', 3.0),
+    ]
@@ -0,0 +1,106 @@
+import json
+import threading
+from pathlib import Path
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from python_scripts import http_client, utils
+
+BENCH_FIXTURES = Path(__file__).resolve().parent.parent / 'benchmarks' / 'fixtures'
+
+@pytest.fixture
+def flaky_server(monkeypatch):
+    """Local server that answers 503 to the first request on every path, then 200"""
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            hits[self.path] = hits.get(self.path, 0) + 1
+            body = b'{"ok": true}'
+            self.send_response(503 if hits[self.path] == 1 else 200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = _respond
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(http_client, '_backoff_delay', lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(http_client, '_replay', None)
+    yield f'http://127.0.0.1:{server.server_port}', hits
+    server.shutdown()
+
+def test_get_is_retried(flaky_server):
+    url, hits = flaky_server
+    response = http_client.get(f'{url}/read')
+    assert response.status_code == 200
+    assert hits['/read'] == 2
+
+def test_post_is_sent_once(flaky_server):
+    url, hits = flaky_server
+    response = http_client.post(f'{url}/create', json={"method": "createQueryRun"})
+    assert response.status_code == 503
+    assert hits['/create'] == 1
+
+def test_post_retried_when_opted_in(flaky_server):
+    url, hits = flaky_server
+    response = http_client.post(f'{url}/poll', json={"method": "getQueryRunResults"}, retry_post=True)
+    assert response.status_code == 200
+    assert hits['/poll'] == 2
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    def load(entries):
+        path = tmp_path / 'http.json'
+        path.write_text(json.dumps(entries))
+        http_client.set_replay(str(path))
+    monkeypatch.setattr(http_client, '_replay', None)
+    yield load
+    http_client.set_replay(None)
+
+def test_replay_matches_one_entry_per_page(replay):
+    url = 'https://api.example.com/items'
+    replay([
+        {"url": url, "query": {"offset": 0, "limit": 2}, "body": [1, 2]},
+        {"url": url, "query": {"offset": 2, "limit": 2}, "body": [3]},
+        {"url": url, "query": {"offset": 4, "limit": 2}, "body": []},
+    ])
+
+    assert utils.get_pagination_results(url, limit=2, window=1) == [1, 2, 3]
+    # Params passed separately are matched the same way as the query string
+    assert http_client.get(url, params={"limit": 2, "offset": 2}).json() == [3]
+    with pytest.raises(LookupError):
+        http_client.get(f'{url}?offset=6&limit=2')
+
+def test_pagination_stops_its_workers_when_a_page_fails(replay, monkeypatch):
+    url = 'https://api.example.com/items'
+    replay([{"url": url, "query": {"offset": 0, "limit": 2}, "body": [1, 2]}])
+    executors = []
+
+    class TrackingExecutor(utils.ThreadPoolExecutor):
+        def shutdown(self, *args, **kwargs):
+            executors.append(kwargs)
+            super().shutdown(*args, **kwargs)
+
+    monkeypatch.setattr(utils, 'ThreadPoolExecutor', TrackingExecutor)
+
+    # The second page has no recording, so its fetch raises
+    with pytest.raises(LookupError):
+        utils.get_pagination_results(url, limit=2, window=2)
+    assert executors == [{"wait": False, "cancel_futures": True}]
+
+def test_replay_matches_json_rpc_params(replay):
+    replay(json.loads((BENCH_FIXTURES / 'http.json').read_text()))
+
+    df = utils.flipside_api_results('select 1', 'key', min_delay=0)
+
+    # Both recorded result pages, not page 1 twice
+    assert len(df) == 96
+    assert df['__row_index'].tolist() == list(range(96))
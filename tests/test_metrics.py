@@ -0,0 +1,63 @@
+import pytest
+from flask import Flask
+
+from python_scripts import collector_api, metrics
+from python_scripts.pipeline import run_stages
+
+@pytest.fixture
+def scrape():
+    metrics.reset()
+    app = Flask(__name__)
+    app.register_blueprint(collector_api.blueprint)
+    client = app.test_client()
+
+    def get():
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        return response.get_data(as_text=True).splitlines()
+
+    yield get
+    metrics.reset()
+
+def sample(lines, prefix):
+    values = [float(line.rsplit(' ', 1)[1]) for line in lines if line.startswith(prefix + ' ')]
+    assert len(values) == 1, f'{prefix} not in {lines}'
+    return values[0]
+
+def test_metrics_endpoint_exposes_timings_and_counters(scrape):
+    with metrics.timed('fetch', 'supply'):
+        pass
+    metrics.inc('rows_written_total', 3, dataset='timeseries')
+    metrics.inc('rows_written_total', 2, dataset='timeseries')
+
+    lines = scrape()
+
+    assert '# HELP rlusd_step_seconds Wall time of collector steps (job, stage, fetch, transform, store)' in lines
+    assert '# TYPE rlusd_step_seconds summary' in lines
+    assert '# TYPE rlusd_rows_written_total counter' in lines
+    assert 'rlusd_rows_written_total{dataset="timeseries"} 5' in lines
+    assert 'rlusd_step_seconds_count{name="supply",step="fetch"} 1' in lines
+    assert sample(lines, 'rlusd_step_seconds_sum{name="supply",step="fetch"}') >= 0
+    assert sample(lines, 'rlusd_step_last_success_timestamp_seconds{name="supply",step="fetch"}') > 0
+    assert not any(line.startswith('rlusd_step_failures_total') for line in lines)
+
+def test_failed_stages_are_timed(scrape):
+    def broken():
+        raise RuntimeError('provider down')
+
+    _, report = run_stages({
+        "fetch": (broken, []),
+        "combine": (lambda fetch: fetch, ['fetch']),
+    }, max_workers=1)
+
+    assert report['fetch']['status'] == 'failed'
+    assert report['fetch']['error'] == 'provider down'
+    assert report['combine']['status'] == 'skipped'
+
+    lines = scrape()
+    assert 'rlusd_step_failures_total{name="fetch",step="stage"} 1' in lines
+    assert 'rlusd_step_seconds_count{name="fetch",step="stage"} 1' in lines
+    assert sample(lines, 'rlusd_step_seconds_sum{name="fetch",step="stage"}') >= 0
+    # A failure never counts as a success
+    assert not any(line.startswith('rlusd_step_last_success_timestamp_seconds{name="fetch"') for line in lines)
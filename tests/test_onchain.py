@@ -0,0 +1,98 @@
+import datetime as dt
+
+import pytest
+
+pytest.importorskip('web3')
+
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from python_scripts import onchain
+
+TOKEN = '0x8292bb45bf1ee4d140127049757c2e0ff06317ed'
+POOLS = ['0xd001ae433f254283fece51d4acce8c53263aa186', '0xcc6d2f26d363836f85a42d249e145ec0320d3e55']
+UNKNOWN_POOL = '0x' + '9' * 40
+BLOCK = 21_000_000
+TIMESTAMP = 1_735_689_600
+
+def selector(signature):
+    return function_signature_to_4byte_selector(signature)
+
+class MulticallNode(BaseProvider):
+    """
+    JSON-RPC stand-in for an Ethereum node with Multicall3 and one ERC-20.
+
+    Answers eth_blockNumber and eth_call to aggregate3, executing every
+    sub-call against in-memory token state; balanceOf for an unknown holder
+    reverts so the allowFailure path is exercised.
+    """
+
+    def __init__(self, decimals, total_supply, balances):
+        super().__init__()
+        self.decimals = decimals
+        self.total_supply = total_supply
+        self.balances = {holder.lower(): value for holder, value in balances.items()}
+        self.calls = []
+
+    def _execute(self, target, calldata):
+        fn, args = calldata[:4], calldata[4:]
+        if target.lower() == onchain.MULTICALL3_ADDRESS.lower() and fn == selector('getCurrentBlockTimestamp()'):
+            return True, encode(['uint256'], [TIMESTAMP])
+        if target.lower() != TOKEN:
+            return False, b''
+        if fn == selector('decimals()'):
+            return True, encode(['uint8'], [self.decimals])
+        if fn == selector('totalSupply()'):
+            return True, encode(['uint256'], [self.total_supply])
+        if fn == selector('balanceOf(address)'):
+            holder = decode(['address'], args)[0].lower()
+            if holder not in self.balances:
+                return False, b''
+            return True, encode(['uint256'], [self.balances[holder]])
+        return False, b''
+
+    def make_request(self, method, params):
+        if method == 'eth_blockNumber':
+            return {"jsonrpc": "2.0", "id": 1, "result": hex(BLOCK)}
+        if method == 'eth_chainId':
+            return {"jsonrpc": "2.0", "id": 1, "result": '0x1'}
+        if method == 'eth_call':
+            transaction, block = params
+            self.calls.append(block)
+            data = bytes.fromhex(transaction['data'][2:])
+            assert data[:4] == selector('aggregate3((address,bool,bytes)[])')
+            (calls,) = decode(['(address,bool,bytes)[]'], data[4:])
+            results = [self._execute(target, calldata) for target, _, calldata in calls]
+            return {"jsonrpc": "2.0", "id": 1, "result": '0x' + encode(['(bool,bytes)[]'], [results]).hex()}
+        raise NotImplementedError(method)
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+def test_erc20_snapshot_reads_everything_in_one_call():
+    node = MulticallNode(decimals=18, total_supply=250_000_000 * 10**18,
+                         balances={POOLS[0]: 3_000_000 * 10**18, POOLS[1]: 1_500_000 * 10**18})
+    w3 = Web3(node)
+
+    snapshot = onchain.erc20_snapshot(TOKEN, POOLS + [UNKNOWN_POOL], w3=w3)
+
+    assert len(node.calls) == 1
+    assert snapshot['block'] == BLOCK
+    assert snapshot['timestamp'] == dt.datetime.fromtimestamp(TIMESTAMP, dt.timezone.utc)
+    assert snapshot['decimals'] == 18
+    assert snapshot['total_supply'] == 250_000_000
+    assert snapshot['balances'] == {POOLS[0]: 3_000_000, POOLS[1]: 1_500_000, UNKNOWN_POOL: None}
+
+def test_multicall_batches_pinned_to_one_block(monkeypatch):
+    monkeypatch.setattr(onchain, 'MULTICALL_BATCH_SIZE', 2)
+    node = MulticallNode(decimals=6, total_supply=10**6, balances={pool: 10**6 for pool in POOLS})
+    w3 = Web3(node)
+
+    snapshot = onchain.erc20_snapshot(TOKEN, POOLS, block=BLOCK - 5, w3=w3)
+
+    # Five calls in batches of two, all at the requested block
+    assert node.calls == [hex(BLOCK - 5)] * 3
+    assert snapshot['block'] == BLOCK - 5
+    assert snapshot['balances'] == {pool: 1.0 for pool in POOLS}
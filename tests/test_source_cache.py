@@ -0,0 +1,106 @@
+import time
+import threading
+
+import pytest
+from cachetools import TTLCache
+
+from python_scripts import source_cache
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(source_cache, 'SOURCE_CACHE_DIR', None)
+    monkeypatch.setattr(source_cache, '_disk', None)
+    monkeypatch.setattr(source_cache, 'stats', dict.fromkeys(source_cache.stats, 0))
+    return TTLCache(maxsize=10, ttl=60)
+
+def wait_for_followers(count):
+    deadline = time.monotonic() + 5
+    while source_cache.stats['shared'] < count:
+        assert time.monotonic() < deadline, 'followers never joined the in-flight fetch'
+        time.sleep(0.01)
+
+def test_concurrent_calls_share_one_fetch(cache):
+    release = threading.Event()
+    calls = []
+
+    @source_cache.source_cached(cache)
+    def supply(chain):
+        calls.append(chain)
+        release.wait(5)
+        return 100.0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(supply('xrpl'))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    # Every follower is parked on the leader's fetch before it returns
+    wait_for_followers(4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ['xrpl']
+    assert results == [100.0] * 5
+    assert supply('xrpl') == 100.0
+    assert source_cache.stats['hits'] == 1
+
+def test_followers_get_the_leaders_error(cache):
+    release = threading.Event()
+    calls = []
+
+    @source_cache.source_cached(cache)
+    def supply():
+        calls.append(1)
+        release.wait(5)
+        raise ConnectionError('node down')
+
+    errors = []
+
+    def call():
+        try:
+            supply()
+        except ConnectionError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_for_followers(2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert errors == ['node down'] * 3
+    assert not source_cache._inflight
+
+def test_failed_results_are_not_cached(cache):
+    results = iter([None, (1.0, None), (1.0, 2.0)])
+
+    @source_cache.source_cached(cache)
+    def supply():
+        return next(results)
+
+    assert supply() is None
+    assert supply() == (1.0, None)
+    assert supply() == (1.0, 2.0)
+    assert supply() == (1.0, 2.0)
+    assert source_cache.stats['misses'] == 3
+
+def test_results_are_written_through_to_disk(cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(source_cache, 'SOURCE_CACHE_DIR', str(tmp_path))
+    calls = []
+
+    @source_cache.source_cached(cache, name='supply')
+    def supply(chain):
+        calls.append(chain)
+        return 100.0
+
+    assert supply('xrpl') == 100.0
+    # A restarted process starts with an empty in-memory cache
+    cache.clear()
+    assert supply('xrpl') == 100.0
+
+    assert calls == ['xrpl']
+    assert source_cache.stats['disk_hits'] == 1
+    source_cache._disk.close()
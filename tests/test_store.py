@@ -0,0 +1,130 @@
+import pandas as pd
+import pytest
+
+from python_scripts import store
+
+def rows(start, values, freq='h', **columns):
+    return pd.DataFrame({
+        "dt": pd.date_range(start, periods=len(values), freq=freq),
+        "value": values,
+        **columns,
+    })
+
+def test_prepend_only_adds_older_rows(store_dir):
+    store.append('series', rows('2025-01-02 00:00', [10.0, 11.0]))
+
+    imported = store.prepend('series', rows('2025-01-01 23:00', [1.0, 2.0, 3.0]))
+
+    assert len(imported) == 1
+    df = store.read('series')
+    assert df['value'].tolist() == [1.0, 10.0, 11.0]
+    assert store.first_time('series') == pd.Timestamp('2025-01-01 23:00')
+
+def test_prepend_into_a_new_dataset(store_dir):
+    store.prepend('series', rows('2025-01-01', [1.0, 2.0]))
+    assert store.read('series')['value'].tolist() == [1.0, 2.0]
+
+def test_append_partitions_by_day(store_dir):
+    manifest = store.append('series', rows('2025-01-01 22:00', [1.0, 2.0, 3.0]))
+
+    assert list(manifest['partitions']) == ['2025-01-01', '2025-01-02']
+    assert manifest['seq'] == 2
+    assert store.read('series')['value'].tolist() == [1.0, 2.0, 3.0]
+
+def test_read_keeps_the_latest_write_per_key(store_dir):
+    store.append('pools', rows('2025-01-01', [1.0, 2.0], pool=['a', 'a']), keep_subset=['pool'])
+    store.append('pools', rows('2025-01-01', [5.0], pool=['b']), keep_subset=['pool'])
+    store.append('pools', rows('2025-01-01 01:00', [20.0], pool=['a']), keep_subset=['pool'])
+
+    df = store.read('pools')
+    assert list(zip(df['pool'], df['value'])) == [('a', 1.0), ('b', 5.0), ('a', 20.0)]
+
+def test_append_rejects_a_different_layout(store_dir):
+    store.append('pools', rows('2025-01-01', [1.0], pool=['a']), keep_subset=['pool'])
+    with pytest.raises(ValueError):
+        store.append('pools', rows('2025-01-01', [1.0], pool=['a']))
+
+def test_compaction_keeps_one_deduplicated_segment(store_dir, monkeypatch):
+    monkeypatch.setattr(store, 'MAX_SEGMENTS', 3)
+    for value in range(4):
+        store.append('series', rows('2025-01-01', [float(value), float(value)]))
+
+    segments = store.load_manifest('series')['partitions']['2025-01-01']['segments']
+    assert len(segments) == 1
+    assert segments[0]['seq'] == 4
+    assert segments[0]['rows'] == 2
+    assert store.read('series')['value'].tolist() == [3.0, 3.0]
+    # Compacted rows keep the seq that wrote them
+    assert store.changes('series', since=3)[0]['value'].tolist() == [3.0, 3.0]
+
+def test_read_limits_to_the_range(store_dir, monkeypatch):
+    store.append('series', rows('2025-01-01', [1.0, 2.0, 3.0, 4.0], freq='D'))
+    read_partitions = []
+    read_partition = store._read_partition
+
+    def tracking(key, partition_id, *args, **kwargs):
+        read_partitions.append(partition_id)
+        return read_partition(key, partition_id, *args, **kwargs)
+
+    monkeypatch.setattr(store, '_read_partition', tracking)
+
+    df = store.read('series', start='2025-01-02', end='2025-01-03')
+    assert df['value'].tolist() == [2.0, 3.0]
+    # Partitions outside the range are never opened
+    assert read_partitions == ['2025-01-02', '2025-01-03']
+    assert store.read('series', start='2025-02-01').empty
+
+def test_tail_reads_the_latest_partition(store_dir):
+    store.append('series', rows('2025-01-01 23:00', [1.0, 2.0, 3.0]))
+    store.append('series', rows('2025-01-02 01:00', [30.0]))
+
+    df = store.tail('series')
+    assert df['dt'].dt.strftime('%H').tolist() == ['00', '01']
+    assert df['value'].tolist() == [2.0, 30.0]
+    assert store.tail('missing').empty
+
+def test_changes_since_a_seq(store_dir):
+    store.append('series', rows('2025-01-01', [1.0, 2.0]))
+    store.append('series', rows('2025-01-01 01:00', [20.0, 3.0]))
+
+    delta, seq = store.changes('series', since=1)
+    assert seq == 2
+    assert delta['value'].tolist() == [20.0, 3.0]
+
+def test_read_columns_added_in_later_segments(store_dir):
+    store.append('series', rows('2025-01-01 00:00', [1.0]))
+    store.append('series', rows('2025-01-01 01:00', [2.0], extra=[5.0]))
+
+    assert store.columns('series') == ['dt', 'value', 'extra']
+    df = store.read('series', columns=['extra'])
+    assert list(df.columns) == ['dt', 'extra']
+    assert df['extra'].isna().tolist() == [True, False]
+    assert store.tail('series', columns=['extra'])['extra'].tolist()[1] == 5.0
+
+def test_last_rows_per_group_across_partitions(store_dir):
+    store.append('lp', rows('2025-01-01 00:00', [1.0, 2.0], pool=['a', 'a'], symbol=['X', 'X']),
+                 keep_subset=['pool', 'symbol'])
+    store.append('lp', rows('2025-01-01 00:00', [7.0], pool=['b'], symbol=['X']), keep_subset=['pool', 'symbol'])
+    # Only pool a has rows on the later days
+    store.append('lp', rows('2025-01-03 05:00', [3.0, 4.0], pool=['a', 'a'], symbol=['X', 'Y']),
+                 keep_subset=['pool', 'symbol'])
+
+    df = store.last_rows('lp', columns=['value'])
+
+    assert list(zip(df['pool'], df['symbol'], df['dt'].dt.strftime('%m-%d %H'), df['value'])) == [
+        ('a', 'X', '01-03 05', 3.0),
+        ('a', 'Y', '01-03 06', 4.0),
+        ('b', 'X', '01-01 00', 7.0),
+    ]
+
+def test_last_rows_for_manifests_without_last_times(store_dir):
+    store.append('lp', rows('2025-01-01 00:00', [1.0, 2.0], pool=['a', 'b']), keep_subset=['pool'])
+    manifest = store.load_manifest('lp')
+    del manifest['last_times']
+    store._write_manifest('lp', manifest)
+
+    assert store.last_rows('lp')['value'].tolist() == [1.0, 2.0]
+    # The next append fills them in from the stored history
+    store.append('lp', rows('2025-01-02 00:00', [3.0], pool=['a']), keep_subset=['pool'])
+    assert set(store.load_manifest('lp')['last_times']) == {'["a"]', '["b"]'}
+    assert store.last_rows('lp')['value'].tolist() == [3.0, 2.0]
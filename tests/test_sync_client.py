@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from python_scripts import collector_api, store, sync_client
+
+def rows(start, values):
+    return pd.DataFrame({
+        "dt": pd.date_range(start, periods=len(values), freq='D'),
+        "value": values,
+    })
+
+@pytest.fixture
+def collector(store_dir, monkeypatch):
+    """Route sync_client's requests to an in-process collector"""
+    app = Flask(__name__)
+    app.register_blueprint(collector_api.blueprint)
+    client = app.test_client()
+
+    def get(url, params=None):
+        response = client.get('/sync', query_string=params)
+        return SimpleNamespace(status_code=response.status_code, headers=response.headers,
+                               content=response.data, raise_for_status=lambda: None)
+
+    monkeypatch.setattr(sync_client, 'http_client', SimpleNamespace(get=get))
+    monkeypatch.setattr(sync_client, '_datasets', {})
+    return client
+
+def test_sync_applies_deltas(collector):
+    store.append('series', rows('2025-01-01', [1.0, 2.0]))
+    assert sync_client.sync('series') == 2
+
+    store.append('series', rows('2025-01-02', [20.0, 3.0]))
+    sync_client.sync('series')
+
+    assert sync_client.read('series')['value'].tolist() == [1.0, 20.0, 3.0]
+
+def test_sync_resyncs_after_the_store_is_recreated(collector):
+    store.append('series', rows('2025-01-01', [1.0, 2.0, 3.0]))
+    seq = sync_client.sync('series')
+
+    # Cleared and grown back past the seq the client holds
+    store.clear('series')
+    store.append('series', rows('2025-03-01', [7.0, 8.0, 9.0, 10.0]))
+    assert store.version('series') > seq
+
+    sync_client.sync('series')
+    df = sync_client.read('series')
+    assert df['value'].tolist() == [7.0, 8.0, 9.0, 10.0]
+    assert df['dt'].min() == pd.Timestamp('2025-03-01')
+
+def test_sync_rejects_invalid_keys(collector):
+    store.append('series', rows('2025-01-01', [1.0]))
+    assert collector.get('/sync?key=../store').status_code == 400
+    assert collector.get('/sync?key=series&since=-1').status_code == 400
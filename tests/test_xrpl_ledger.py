@@ -0,0 +1,190 @@
+import json
+import time
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip('xrpl')
+from websockets.asyncio.server import serve
+
+from python_scripts import store, xrpl_ledger
+
+ISSUER = 'rMxCKbEDwqr76QuheSUMdEGf4B9xJ8m5De'
+POOL = 'rhWTXC2m2gGGA9WozUaoMm6kLAVPb1tcS3'
+MISSING_POOL = 'rBcKWmbh4ts1Lz8mYrMLRqTyAn4mTNCnnr'
+HEX = xrpl_ledger.RLUSD_CURRENCY_HEX
+# Ripple epoch seconds for 2025-01-01 00:00 UTC
+LEDGER_TIME = 788918400
+
+class MockNode:
+    """
+    Websocket stand-in for rippled.
+
+    Answers the requests the collector makes from per-connection state and,
+    after a subscribe, pushes the stream messages queued for that connection.
+    A connection whose queue is exhausted is closed by the server, forcing
+    the client to reconnect.
+    """
+
+    def __init__(self, sessions):
+        self.sessions = list(sessions)
+        self.connections = 0
+        self.requests = []
+        self.port = None
+        self._ready = threading.Event()
+
+    def response(self, request, ledger_index):
+        command = request['command']
+        if command == 'subscribe':
+            return {}
+        if command == 'ledger':
+            return {"ledger_index": ledger_index}
+        if command == 'gateway_balances':
+            return {"ledger_index": ledger_index, "obligations": {HEX: "1000"}}
+        if command == 'account_info':
+            return {"ledger_index": ledger_index, "account_data": {"Account": POOL, "Balance": "5000000"}}
+        if command == 'account_lines':
+            return {"ledger_index": ledger_index, "lines": [{"currency": HEX, "balance": "200", "account": ISSUER}]}
+        if command == 'amm_info':
+            if request['amm_account'] != POOL:
+                return None
+            return {"ledger_index": request['ledger_index'], "amm": {
+                "account": POOL,
+                "amount": "7000000",
+                "amount2": {"currency": HEX, "issuer": ISSUER, "value": "300"},
+                "lp_token": {"currency": "03ABC", "issuer": POOL, "value": "12.5"},
+                "trading_fee": 500,
+            }}
+        raise AssertionError(f'unexpected command {command}')
+
+    async def handler(self, websocket):
+        session = self.sessions[min(self.connections, len(self.sessions) - 1)]
+        self.connections += 1
+        async for raw in websocket:
+            request = json.loads(raw)
+            self.requests.append(request)
+            result = self.response(request, session['ledger_index'])
+            if 'id' not in request:
+                # Fire-and-forget sends (the subscribe) get no reply here
+                pass
+            elif result is None:
+                message = {"id": request['id'], "type": "response", "status": "error", "error": "actNotFound",
+                           "request": request}
+            else:
+                message = {"id": request['id'], "type": "response", "status": "success", "result": result}
+            if 'id' in request:
+                await websocket.send(json.dumps(message))
+
+            if request['command'] == 'account_lines' and 'stream' in session:
+                for stream_message in session['stream']:
+                    await websocket.send(json.dumps(stream_message))
+                # Give the client time to consume the stream before dropping it
+                await asyncio.sleep(0.5)
+                await websocket.close()
+                return
+
+    def start(self):
+        def run():
+            async def main():
+                async with serve(self.handler, '127.0.0.1', 0) as server:
+                    self.port = server.sockets[0].getsockname()[1]
+                    self._ready.set()
+                    await asyncio.Future()
+            asyncio.run(main())
+
+        threading.Thread(target=run, daemon=True).start()
+        self._ready.wait(5)
+        return f'ws://127.0.0.1:{self.port}'
+
+def pool_payment(ledger_index, xrp_delta_drops, rlusd_before, rlusd_after):
+    """A validated transaction moving XRP and RLUSD into the pool"""
+    return {
+        "type": "transaction",
+        "validated": True,
+        "ledger_index": ledger_index,
+        "meta": {
+            "TransactionResult": "tesSUCCESS",
+            "AffectedNodes": [
+                {"ModifiedNode": {
+                    "LedgerEntryType": "AccountRoot",
+                    "LedgerIndex": "A" * 64,
+                    "FinalFields": {"Account": POOL, "Balance": str(5000000 + xrp_delta_drops)},
+                    "PreviousFields": {"Balance": "5000000"},
+                }},
+                {"ModifiedNode": {
+                    "LedgerEntryType": "RippleState",
+                    "LedgerIndex": "B" * 64,
+                    "FinalFields": {
+                        "Balance": {"currency": HEX, "issuer": "rrrrrrrrrrrrrrrrrrrrBZbvji", "value": rlusd_after},
+                        "HighLimit": {"currency": HEX, "issuer": POOL, "value": "0"},
+                        "LowLimit": {"currency": HEX, "issuer": ISSUER, "value": "0"},
+                    },
+                    "PreviousFields": {
+                        "Balance": {"currency": HEX, "issuer": "rrrrrrrrrrrrrrrrrrrrBZbvji", "value": rlusd_before},
+                    },
+                }},
+            ],
+        },
+    }
+
+def ledger_closed(ledger_index, seconds_after):
+    return {"type": "ledgerClosed", "ledger_index": ledger_index, "ledger_time": LEDGER_TIME + seconds_after}
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(xrpl_ledger, '_state', {
+        "ledger_index": None, "ledger_time": None, "supply": None, "pools": {}, "last_snapshot": None,
+    })
+
+def test_amm_snapshot_maps_the_batch_responses():
+    node = MockNode([{"ledger_index": 9000}])
+    url = node.start()
+
+    ledger_index, pools, supply = xrpl_ledger.amm_snapshot([POOL, MISSING_POOL], ISSUER, url=url)
+
+    assert ledger_index == 9000
+    assert supply == 1000.0
+    # The pool amm_info can't resolve is left out; the other is mapped by id
+    assert pools.to_dict('records') == [{
+        "pool": POOL, "ledger_index": 9000, "xrp_bal": 7.0, "rlusd_bal": 300.0,
+        "lp_tokens": 12.5, "trading_fee": 500,
+    }]
+    # Everything was pinned to the ledger fetched first
+    pinned = [request for request in node.requests if request['command'] in ('amm_info', 'gateway_balances')]
+    assert len(pinned) == 3
+    assert all(request['ledger_index'] == 9000 for request in pinned)
+
+def test_stream_applies_transactions_and_reconnects(store_dir, fresh_state, monkeypatch):
+    monkeypatch.setattr(xrpl_ledger, 'XRPL_SNAPSHOT_INTERVAL', 0)
+    monkeypatch.setattr(xrpl_ledger, 'XRPL_STREAM_TIMEOUT', 1)
+    node = MockNode([
+        {"ledger_index": 100, "stream": [
+            pool_payment(101, 1000000, "-200", "-250"),
+            ledger_closed(101, 0),
+            # Already covered by the snapshot on the next connection
+        ]},
+        {"ledger_index": 200, "stream": [
+            pool_payment(150, 9000000, "-200", "-900"),
+            pool_payment(201, 2000000, "-200", "-210"),
+            ledger_closed(201, 60),
+        ]},
+    ])
+    url = node.start()
+
+    xrpl_ledger.start_background(url, ISSUER, [POOL])
+
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline and len(store.read(xrpl_ledger.POOLS_KEY)) < 2:
+        time.sleep(0.1)
+
+    snapshots = store.read(xrpl_ledger.POOLS_KEY)
+    assert node.connections >= 2
+    assert snapshots['ledger_index'].tolist()[:2] == [101, 201]
+    # Each connection starts from a fresh snapshot; only newer transactions apply
+    assert snapshots['xrp_bal'].tolist()[:2] == [6.0, 7.0]
+    assert snapshots['rlusd_bal'].tolist()[:2] == [250.0, 210.0]
+
+    subscribes = [request for request in node.requests if request['command'] == 'subscribe']
+    assert len(subscribes) >= 2
+    assert subscribes[0]['accounts'] == [ISSUER, POOL]